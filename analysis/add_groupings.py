@@ -1,4 +1,5 @@
 from comparisons import gt, gte, lt, lte
+from day_offsets import isnull, notnull
 
 
 def add_groupings(df):
@@ -6,15 +7,15 @@ def add_groupings(df):
     #
     # IF IMMRX_DAT <> NULL     | Select | Next
     # IF IMMDX_COV_DAT <> NULL | Select | Reject
-    df["immuno_group"] = df["immrx_dat"].notnull() | df["immdx_cov_dat"].notnull()
+    df["immuno_group"] = notnull(df["immrx_dat"]) | notnull(df["immdx_cov_dat"])
 
     # Patients with CKD
     #
     # IF CKD_COV_DAT <> NULL (diagnoses) | Select | Next
     # IF CKD15_DAT = NULL  (No stages)   | Reject | Next
     # IF CKD35_DAT>=CKD15_DAT            | Select | Reject
-    df["ckd_group"] = df["ckd_cov_dat"].notnull() | (
-        df["ckd15_dat"].notnull() & gte(df["ckd35_dat"], df["ckd15_dat"])
+    df["ckd_group"] = notnull(df["ckd_cov_dat"]) | (
+        notnull(df["ckd15_dat"]) & gte(df["ckd35_dat"], df["ckd15_dat"])
     )
 
     # Patients with Asthma
@@ -24,23 +25,23 @@ def add_groupings(df):
     # IF ASTRXM1 <> NULL    | Next   | Reject
     # IF ASTRXM2 <> NULL    | Next   | Reject
     # IF ASTRXM3 <> NULL    | Select | Reject
-    df["ast_group"] = df["astadm_dat"].notnull() | (
-        df["ast_dat"].notnull()
-        & df["astrxm1_dat"].notnull()
-        & df["astrxm2_dat"].notnull()
-        & df["astrxm3_dat"].notnull()
+    df["ast_group"] = notnull(df["astadm_dat"]) | (
+        notnull(df["ast_dat"])
+        & notnull(df["astrxm1_dat"])
+        & notnull(df["astrxm2_dat"])
+        & notnull(df["astrxm3_dat"])
     )
 
     # Patients with CNS Disease (including Stroke/TIA)
     #
     # IF CNS_COV_DAT <> NULL | Select | Reject
-    df["cns_group"] = df["cns_cov_dat"].notnull()
+    df["cns_group"] = notnull(df["cns_cov_dat"])
 
     # Patients who have Chronic Respiratory Disease
     #
     # IF AST_GROUP <> NULL    | Select | Next
     # IF RESP_COV_DAT <> NULL | Select | Reject
-    df["resp_group"] = df["ast_group"] | df["resp_cov_dat"].notnull()
+    df["resp_group"] = df["ast_group"] | notnull(df["resp_cov_dat"])
 
     # Patients with Morbid Obesity
     #
@@ -75,11 +76,11 @@ def add_groupings(df):
         | df["ckd_group"]
         | df["resp_group"]
         | df["diab_group"]
-        | df["cld_dat"].notnull()
+        | notnull(df["cld_dat"])
         | df["cns_group"]
-        | df["chd_cov_dat"].notnull()
-        | df["spln_cov_dat"].notnull()
-        | df["learndis_dat"].notnull()
+        | notnull(df["chd_cov_dat"])
+        | notnull(df["spln_cov_dat"])
+        | notnull(df["learndis_dat"])
         | df["sevment_group"]
     )
 
@@ -87,7 +88,7 @@ def add_groupings(df):
     #
     # IF COVRX1_DAT <> NULL  | Select | Next
     # IF COVADM1_DAT <> NULL | Select | Reject
-    df["covax1d_group"] = df["covrx1_dat"].notnull() | df["covadm1_dat"].notnull()
+    df["covax1d_group"] = notnull(df["covrx1_dat"]) | notnull(df["covadm1_dat"])
 
     # Patients who have received at least 2 doses of a COVID Vaccination
     #
@@ -95,7 +96,7 @@ def add_groupings(df):
     # IF COVRX2_DAT <> NULL    | Select | Next
     # IF COVADM2_DAT <> NULL   | Select | Reject
     df["covax2d_group"] = df["covax1d_group"] & (
-        df["covrx2_dat"].notnull() | df["covadm2_dat"].notnull()
+        notnull(df["covrx2_dat"]) | notnull(df["covadm2_dat"])
     )
 
     # Patients who have an unstated dose 1 vaccination type
@@ -110,13 +111,13 @@ def add_groupings(df):
     # IF VLD1RX_DAT <> NULL    | Reject | Select
     df["unstatvacc1_group"] = (
         df["covax1d_group"]
-        & df["azd1rx_dat"].isnull()
-        & df["pfd1rx_dat"].isnull()
-        & df["mod1rx_dat"].isnull()
-        & df["nxd1rx_dat"].isnull()
-        & df["jnd1rx_dat"].isnull()
-        & df["gsd1rx_dat"].isnull()
-        & df["vld1rx_dat"].isnull()
+        & isnull(df["azd1rx_dat"])
+        & isnull(df["pfd1rx_dat"])
+        & isnull(df["mod1rx_dat"])
+        & isnull(df["nxd1rx_dat"])
+        & isnull(df["jnd1rx_dat"])
+        & isnull(df["gsd1rx_dat"])
+        & isnull(df["vld1rx_dat"])
     )
 
     # Patients who have an unstated dose 2 vaccination type
@@ -131,13 +132,13 @@ def add_groupings(df):
     # IF VLD2RX_DAT <> NULL    | Reject | Select
     df["unstatvacc2_group"] = (
         df["covax2d_group"]
-        & df["azd2rx_dat"].isnull()
-        & df["pfd2rx_dat"].isnull()
-        & df["mod2rx_dat"].isnull()
-        & df["nxd2rx_dat"].isnull()
-        & df["jnd2rx_dat"].isnull()
-        & df["gsd2rx_dat"].isnull()
-        & df["vld2rx_dat"].isnull()
+        & isnull(df["azd2rx_dat"])
+        & isnull(df["pfd2rx_dat"])
+        & isnull(df["mod2rx_dat"])
+        & isnull(df["nxd2rx_dat"])
+        & isnull(df["jnd2rx_dat"])
+        & isnull(df["gsd2rx_dat"])
+        & isnull(df["vld2rx_dat"])
     )
 
     # Patients who are shielding (High Risk from COVID-19)
@@ -145,8 +146,8 @@ def add_groupings(df):
     # IF SHIELD_DAT = NULL                           | Reject | Next
     # IF SHIELD_DAT <> NULL AND NONSHIELD_DAT = NULL | Select | Next
     # IF SHIELD_DAT > NONSHIELD_DAT                  | Select | Reject
-    df["shield_group"] = df["shield_dat"].notnull() & (
-        (df["shield_dat"].notnull() & df["nonshield_dat"].isnull())
+    df["shield_group"] = notnull(df["shield_dat"]) & (
+        (notnull(df["shield_dat"]) & isnull(df["nonshield_dat"]))
         | gt(df["shield_dat"], df["nonshield_dat"])
     )
 
@@ -154,4 +155,4 @@ def add_groupings(df):
     #
     # IF PREG_DAT<> NULL        | Next   | Reject
     # IF PREGDEL_DAT > PREG_DAT | Reject | Select
-    df["preg_group"] = df["preg_dat"].notnull() & lte(df["pregdel_dat"], df["preg_dat"])
+    df["preg_group"] = notnull(df["preg_dat"]) & lte(df["pregdel_dat"], df["preg_dat"])
@@ -292,6 +292,226 @@ def add_preg_group(row):
         return True
 
 
+# Columns of the rows that add_groupings_2_block() reads
+block_input_cols = [
+    "immrx_dat",
+    "immdx_cov_dat",
+    "ckd_cov_dat",
+    "ckd15_dat",
+    "ckd35_dat",
+    "astadm_dat",
+    "ast_dat",
+    "astrxm1_dat",
+    "astrxm2_dat",
+    "astrxm3_dat",
+    "cns_cov_dat",
+    "resp_cov_dat",
+    "sev_obesity_dat",
+    "bmi_dat",
+    "bmi_val",
+    "diab_dat",
+    "dmres_dat",
+    "sev_mental_dat",
+    "smhres_dat",
+    "cld_dat",
+    "chd_cov_dat",
+    "spln_cov_dat",
+    "learndis_dat",
+    "covrx1_dat",
+    "covadm1_dat",
+    "covrx2_dat",
+    "covadm2_dat",
+    "azd1rx_dat",
+    "pfd1rx_dat",
+    "mod1rx_dat",
+    "nxd1rx_dat",
+    "jnd1rx_dat",
+    "gsd1rx_dat",
+    "vld1rx_dat",
+    "azd2rx_dat",
+    "pfd2rx_dat",
+    "mod2rx_dat",
+    "nxd2rx_dat",
+    "jnd2rx_dat",
+    "gsd2rx_dat",
+    "vld2rx_dat",
+    "shield_dat",
+    "nonshield_dat",
+    "preg_dat",
+    "pregdel_dat",
+]
+
+# Columns that add_groupings_2_block() adds
+block_output_cols = [
+    "immuno_group",
+    "ckd_group",
+    "ast_group",
+    "cns_group",
+    "resp_group",
+    "bmi_group",
+    "diab_group",
+    "sevment_group",
+    "atrisk_group",
+    "covax1d_group",
+    "covax2d_group",
+    "unstatvacc1_group",
+    "unstatvacc2_group",
+    "shield_group",
+    "preg_group",
+]
+
+
+def add_groupings_2_block(block):
+    block["immuno_group"] = [
+        bool(immrx_dat or immdx_cov_dat)
+        for immrx_dat, immdx_cov_dat in zip(block["immrx_dat"], block["immdx_cov_dat"])
+    ]
+
+    block["ckd_group"] = [
+        bool(ckd_cov_dat or (ckd15_dat and gte(ckd35_dat, ckd15_dat)))
+        for ckd_cov_dat, ckd15_dat, ckd35_dat in zip(
+            block["ckd_cov_dat"], block["ckd15_dat"], block["ckd35_dat"]
+        )
+    ]
+
+    block["ast_group"] = [
+        bool(astadm_dat or (ast_dat and astrxm1_dat and astrxm2_dat and astrxm3_dat))
+        for astadm_dat, ast_dat, astrxm1_dat, astrxm2_dat, astrxm3_dat in zip(
+            block["astadm_dat"],
+            block["ast_dat"],
+            block["astrxm1_dat"],
+            block["astrxm2_dat"],
+            block["astrxm3_dat"],
+        )
+    ]
+
+    block["cns_group"] = [bool(cns_cov_dat) for cns_cov_dat in block["cns_cov_dat"]]
+
+    block["resp_group"] = [
+        bool(ast_group or resp_cov_dat)
+        for ast_group, resp_cov_dat in zip(block["ast_group"], block["resp_cov_dat"])
+    ]
+
+    block["bmi_group"] = [
+        bool(gt(sev_obesity_dat, bmi_dat) or gte(bmi_val, 40))
+        for sev_obesity_dat, bmi_dat, bmi_val in zip(
+            block["sev_obesity_dat"], block["bmi_dat"], block["bmi_val"]
+        )
+    ]
+
+    block["diab_group"] = [
+        bool(gt(diab_dat, dmres_dat))
+        for diab_dat, dmres_dat in zip(block["diab_dat"], block["dmres_dat"])
+    ]
+
+    block["sevment_group"] = [
+        bool(gt(sev_mental_dat, smhres_dat))
+        for sev_mental_dat, smhres_dat in zip(
+            block["sev_mental_dat"], block["smhres_dat"]
+        )
+    ]
+
+    block["atrisk_group"] = [
+        bool(
+            immuno_group
+            or ckd_group
+            or resp_group
+            or diab_group
+            or cld_dat
+            or cns_group
+            or chd_cov_dat
+            or spln_cov_dat
+            or learndis_dat
+            or sevment_group
+        )
+        for immuno_group, ckd_group, resp_group, diab_group, cld_dat, cns_group, chd_cov_dat, spln_cov_dat, learndis_dat, sevment_group in zip(
+            block["immuno_group"],
+            block["ckd_group"],
+            block["resp_group"],
+            block["diab_group"],
+            block["cld_dat"],
+            block["cns_group"],
+            block["chd_cov_dat"],
+            block["spln_cov_dat"],
+            block["learndis_dat"],
+            block["sevment_group"],
+        )
+    ]
+
+    block["covax1d_group"] = [
+        bool(covrx1_dat or covadm1_dat)
+        for covrx1_dat, covadm1_dat in zip(block["covrx1_dat"], block["covadm1_dat"])
+    ]
+
+    block["covax2d_group"] = [
+        bool(covax1d_group and (covrx2_dat or covadm2_dat))
+        for covax1d_group, covrx2_dat, covadm2_dat in zip(
+            block["covax1d_group"], block["covrx2_dat"], block["covadm2_dat"]
+        )
+    ]
+
+    block["unstatvacc1_group"] = [
+        bool(
+            covax1d_group
+            and not azd1rx_dat
+            and not pfd1rx_dat
+            and not mod1rx_dat
+            and not nxd1rx_dat
+            and not jnd1rx_dat
+            and not gsd1rx_dat
+            and not vld1rx_dat
+        )
+        for covax1d_group, azd1rx_dat, pfd1rx_dat, mod1rx_dat, nxd1rx_dat, jnd1rx_dat, gsd1rx_dat, vld1rx_dat in zip(
+            block["covax1d_group"],
+            block["azd1rx_dat"],
+            block["pfd1rx_dat"],
+            block["mod1rx_dat"],
+            block["nxd1rx_dat"],
+            block["jnd1rx_dat"],
+            block["gsd1rx_dat"],
+            block["vld1rx_dat"],
+        )
+    ]
+
+    block["unstatvacc2_group"] = [
+        bool(
+            covax2d_group
+            and not azd2rx_dat
+            and not pfd2rx_dat
+            and not mod2rx_dat
+            and not nxd2rx_dat
+            and not jnd2rx_dat
+            and not gsd2rx_dat
+            and not vld2rx_dat
+        )
+        for covax2d_group, azd2rx_dat, pfd2rx_dat, mod2rx_dat, nxd2rx_dat, jnd2rx_dat, gsd2rx_dat, vld2rx_dat in zip(
+            block["covax2d_group"],
+            block["azd2rx_dat"],
+            block["pfd2rx_dat"],
+            block["mod2rx_dat"],
+            block["nxd2rx_dat"],
+            block["jnd2rx_dat"],
+            block["gsd2rx_dat"],
+            block["vld2rx_dat"],
+        )
+    ]
+
+    block["shield_group"] = [
+        bool(
+            shield_dat
+            and ((shield_dat and not nonshield_dat) or gt(shield_dat, nonshield_dat))
+        )
+        for shield_dat, nonshield_dat in zip(
+            block["shield_dat"], block["nonshield_dat"]
+        )
+    ]
+
+    block["preg_group"] = [
+        bool(preg_dat and not gt(pregdel_dat, preg_dat))
+        for preg_dat, pregdel_dat in zip(block["preg_dat"], block["pregdel_dat"])
+    ]
+
+
 def gt(lhs, rhs):
     if not lhs:
         return False
@@ -0,0 +1,233 @@
+import numpy as np
+
+from day_offsets import to_ordinals
+
+
+def add_groupings_numpy(df):
+    _, immrx_dat_mask = to_ordinals(df["immrx_dat"])
+    _, immdx_cov_dat_mask = to_ordinals(df["immdx_cov_dat"])
+    _, ckd_cov_dat_mask = to_ordinals(df["ckd_cov_dat"])
+    ckd15_dat_ordinals, ckd15_dat_mask = to_ordinals(df["ckd15_dat"])
+    ckd35_dat_ordinals, ckd35_dat_mask = to_ordinals(df["ckd35_dat"])
+    _, astadm_dat_mask = to_ordinals(df["astadm_dat"])
+    _, ast_dat_mask = to_ordinals(df["ast_dat"])
+    _, astrxm1_dat_mask = to_ordinals(df["astrxm1_dat"])
+    _, astrxm2_dat_mask = to_ordinals(df["astrxm2_dat"])
+    _, astrxm3_dat_mask = to_ordinals(df["astrxm3_dat"])
+    _, cns_cov_dat_mask = to_ordinals(df["cns_cov_dat"])
+    _, resp_cov_dat_mask = to_ordinals(df["resp_cov_dat"])
+    sev_obesity_dat_ordinals, sev_obesity_dat_mask = to_ordinals(df["sev_obesity_dat"])
+    bmi_dat_ordinals, bmi_dat_mask = to_ordinals(df["bmi_dat"])
+    diab_dat_ordinals, diab_dat_mask = to_ordinals(df["diab_dat"])
+    dmres_dat_ordinals, dmres_dat_mask = to_ordinals(df["dmres_dat"])
+    sev_mental_dat_ordinals, sev_mental_dat_mask = to_ordinals(df["sev_mental_dat"])
+    smhres_dat_ordinals, smhres_dat_mask = to_ordinals(df["smhres_dat"])
+    _, cld_dat_mask = to_ordinals(df["cld_dat"])
+    _, chd_cov_dat_mask = to_ordinals(df["chd_cov_dat"])
+    _, spln_cov_dat_mask = to_ordinals(df["spln_cov_dat"])
+    _, learndis_dat_mask = to_ordinals(df["learndis_dat"])
+    _, covrx1_dat_mask = to_ordinals(df["covrx1_dat"])
+    _, covadm1_dat_mask = to_ordinals(df["covadm1_dat"])
+    _, covrx2_dat_mask = to_ordinals(df["covrx2_dat"])
+    _, covadm2_dat_mask = to_ordinals(df["covadm2_dat"])
+    _, azd1rx_dat_mask = to_ordinals(df["azd1rx_dat"])
+    _, pfd1rx_dat_mask = to_ordinals(df["pfd1rx_dat"])
+    _, mod1rx_dat_mask = to_ordinals(df["mod1rx_dat"])
+    _, nxd1rx_dat_mask = to_ordinals(df["nxd1rx_dat"])
+    _, jnd1rx_dat_mask = to_ordinals(df["jnd1rx_dat"])
+    _, gsd1rx_dat_mask = to_ordinals(df["gsd1rx_dat"])
+    _, vld1rx_dat_mask = to_ordinals(df["vld1rx_dat"])
+    _, azd2rx_dat_mask = to_ordinals(df["azd2rx_dat"])
+    _, pfd2rx_dat_mask = to_ordinals(df["pfd2rx_dat"])
+    _, mod2rx_dat_mask = to_ordinals(df["mod2rx_dat"])
+    _, nxd2rx_dat_mask = to_ordinals(df["nxd2rx_dat"])
+    _, jnd2rx_dat_mask = to_ordinals(df["jnd2rx_dat"])
+    _, gsd2rx_dat_mask = to_ordinals(df["gsd2rx_dat"])
+    _, vld2rx_dat_mask = to_ordinals(df["vld2rx_dat"])
+    shield_dat_ordinals, shield_dat_mask = to_ordinals(df["shield_dat"])
+    nonshield_dat_ordinals, nonshield_dat_mask = to_ordinals(df["nonshield_dat"])
+    preg_dat_ordinals, preg_dat_mask = to_ordinals(df["preg_dat"])
+    pregdel_dat_ordinals, pregdel_dat_mask = to_ordinals(df["pregdel_dat"])
+    bmi_val = df["bmi_val"].values
+
+    n = len(df)
+    tmp0 = np.empty(n, dtype=bool)
+
+    # Patients with Immunosuppression
+    #
+    # IF IMMRX_DAT <> NULL     | Select | Next
+    # IF IMMDX_COV_DAT <> NULL | Select | Reject
+    immuno_group = np.empty(n, dtype=bool)
+    np.logical_or(immrx_dat_mask, immdx_cov_dat_mask, out=immuno_group)
+    df["immuno_group"] = immuno_group
+
+    # Patients with CKD
+    #
+    # IF CKD_COV_DAT <> NULL (diagnoses) | Select | Next
+    # IF CKD15_DAT = NULL  (No stages)   | Reject | Next
+    # IF CKD35_DAT>=CKD15_DAT            | Select | Reject
+    ckd_group = np.empty(n, dtype=bool)
+    np.greater_equal(ckd35_dat_ordinals, ckd15_dat_ordinals, out=ckd_group)
+    np.logical_and(ckd_group, ckd35_dat_mask, out=ckd_group)
+    np.logical_and(ckd_group, ckd15_dat_mask, out=ckd_group)
+    np.logical_or(ckd_group, ckd_cov_dat_mask, out=ckd_group)
+    df["ckd_group"] = ckd_group
+
+    # Patients with Asthma
+    #
+    # IF ASTADM_DAT <> NULL | Select | Next
+    # IF AST_DAT <> NULL    | Next   | Reject
+    # IF ASTRXM1 <> NULL    | Next   | Reject
+    # IF ASTRXM2 <> NULL    | Next   | Reject
+    # IF ASTRXM3 <> NULL    | Select | Reject
+    ast_group = np.empty(n, dtype=bool)
+    np.logical_and(ast_dat_mask, astrxm1_dat_mask, out=ast_group)
+    np.logical_and(ast_group, astrxm2_dat_mask, out=ast_group)
+    np.logical_and(ast_group, astrxm3_dat_mask, out=ast_group)
+    np.logical_or(ast_group, astadm_dat_mask, out=ast_group)
+    df["ast_group"] = ast_group
+
+    # Patients with CNS Disease (including Stroke/TIA)
+    #
+    # IF CNS_COV_DAT <> NULL | Select | Reject
+    cns_group = np.empty(n, dtype=bool)
+    np.copyto(cns_group, cns_cov_dat_mask)
+    df["cns_group"] = cns_group
+
+    # Patients who have Chronic Respiratory Disease
+    #
+    # IF AST_GROUP <> NULL    | Select | Next
+    # IF RESP_COV_DAT <> NULL | Select | Reject
+    resp_group = np.empty(n, dtype=bool)
+    np.logical_or(ast_group, resp_cov_dat_mask, out=resp_group)
+    df["resp_group"] = resp_group
+
+    # Patients with Morbid Obesity
+    #
+    # IF SEV_OBESITY_DAT > BMI_DAT | Select | Next
+    # IF BMI_VAL >=40              | Select | Reject
+    bmi_group = np.empty(n, dtype=bool)
+    np.greater(sev_obesity_dat_ordinals, bmi_dat_ordinals, out=bmi_group)
+    np.greater_equal(bmi_val, 40, out=tmp0)
+    np.logical_or(bmi_group, tmp0, out=bmi_group)
+    df["bmi_group"] = bmi_group
+
+    # Patients with Diabetes
+    #
+    # IF DIAB_DAT > DMRES_DAT | Select | Reject
+    diab_group = np.empty(n, dtype=bool)
+    np.greater(diab_dat_ordinals, dmres_dat_ordinals, out=diab_group)
+    df["diab_group"] = diab_group
+
+    # Patients with Severe Mental Health
+    #
+    # IF SEV_MENTAL_DAT > SMHRES_DAT | Select | Reject
+    sevment_group = np.empty(n, dtype=bool)
+    np.greater(sev_mental_dat_ordinals, smhres_dat_ordinals, out=sevment_group)
+    df["sevment_group"] = sevment_group
+
+    # Patients in Any Clinical Risk Group
+    #
+    # IF IMMUNOGROUP <> NULL   | Select | Next
+    # IF CKD_GROUP <> NULL     | Select | Next
+    # IF RESP_GROUP <> NULL    | Select | Next
+    # IF DIAB_GROUP <> NULL    | Select | Next
+    # IF CLD_DAT <>NULL        | Select | Next
+    # IF CNS_GROUP <> NULL     | Select | Next
+    # IF CHD_COV_DAT <> NULL   | Select | Next
+    # IF SPLN_COV_DAT <> NULL  | Select | Next
+    # IF LEARNDIS_DAT <> NULL  | Select | Next
+    # IF SEVMENT_GROUP <> NULL | Select | Reject
+    atrisk_group = np.empty(n, dtype=bool)
+    np.logical_or(immuno_group, ckd_group, out=atrisk_group)
+    np.logical_or(atrisk_group, resp_group, out=atrisk_group)
+    np.logical_or(atrisk_group, diab_group, out=atrisk_group)
+    np.logical_or(atrisk_group, cld_dat_mask, out=atrisk_group)
+    np.logical_or(atrisk_group, cns_group, out=atrisk_group)
+    np.logical_or(atrisk_group, chd_cov_dat_mask, out=atrisk_group)
+    np.logical_or(atrisk_group, spln_cov_dat_mask, out=atrisk_group)
+    np.logical_or(atrisk_group, learndis_dat_mask, out=atrisk_group)
+    np.logical_or(atrisk_group, sevment_group, out=atrisk_group)
+    df["atrisk_group"] = atrisk_group
+
+    # Patients who have received at least 1 dose of a COVID Vaccination
+    #
+    # IF COVRX1_DAT <> NULL  | Select | Next
+    # IF COVADM1_DAT <> NULL | Select | Reject
+    covax1d_group = np.empty(n, dtype=bool)
+    np.logical_or(covrx1_dat_mask, covadm1_dat_mask, out=covax1d_group)
+    df["covax1d_group"] = covax1d_group
+
+    # Patients who have received at least 2 doses of a COVID Vaccination
+    #
+    # IF COVAX1D_GROUP <> NULL | Next   | Reject
+    # IF COVRX2_DAT <> NULL    | Select | Next
+    # IF COVADM2_DAT <> NULL   | Select | Reject
+    covax2d_group = np.empty(n, dtype=bool)
+    np.logical_or(covrx2_dat_mask, covadm2_dat_mask, out=covax2d_group)
+    np.logical_and(covax2d_group, covax1d_group, out=covax2d_group)
+    df["covax2d_group"] = covax2d_group
+
+    # Patients who have an unstated dose 1 vaccination type
+    #
+    # IF COVAX1D_GROUP <> NULL | Next   | Reject
+    # IF AZD1RX_DAT <> NULL    | Reject | Next
+    # IF PFD1RX_DAT <> NULL    | Reject | Next
+    # IF MOD1RX_DAT <> NULL    | Reject | Next
+    # IF NXD1RX_DAT <> NULL    | Reject | Next
+    # IF JND1RX _DAT <> NULL   | Reject | Next
+    # IF GSD1RX_DAT <> NULL    | Reject | Next
+    # IF VLD1RX_DAT <> NULL    | Reject | Select
+    unstatvacc1_group = np.empty(n, dtype=bool)
+    np.logical_or(azd1rx_dat_mask, pfd1rx_dat_mask, out=unstatvacc1_group)
+    np.logical_or(unstatvacc1_group, mod1rx_dat_mask, out=unstatvacc1_group)
+    np.logical_or(unstatvacc1_group, nxd1rx_dat_mask, out=unstatvacc1_group)
+    np.logical_or(unstatvacc1_group, jnd1rx_dat_mask, out=unstatvacc1_group)
+    np.logical_or(unstatvacc1_group, gsd1rx_dat_mask, out=unstatvacc1_group)
+    np.logical_or(unstatvacc1_group, vld1rx_dat_mask, out=unstatvacc1_group)
+    np.logical_not(unstatvacc1_group, out=unstatvacc1_group)
+    np.logical_and(unstatvacc1_group, covax1d_group, out=unstatvacc1_group)
+    df["unstatvacc1_group"] = unstatvacc1_group
+
+    # Patients who have an unstated dose 2 vaccination type
+    #
+    # IF COVAX2D_GROUP <> NULL | Next   | Reject
+    # IF AZD2RX_DAT <> NULL    | Reject | Next
+    # IF PFD2RX_DAT <> NULL    | Reject | Next
+    # IF MOD2RX_DAT <> NULL    | Reject | Next
+    # IF NXD2RX_DAT <> NULL    | Reject | Next
+    # IF JND2RX _DAT <> NULL   | Reject | Next
+    # IF GSD2RX_DAT <> NULL    | Reject | Next
+    # IF VLD2RX_DAT <> NULL    | Reject | Select
+    unstatvacc2_group = np.empty(n, dtype=bool)
+    np.logical_or(azd2rx_dat_mask, pfd2rx_dat_mask, out=unstatvacc2_group)
+    np.logical_or(unstatvacc2_group, mod2rx_dat_mask, out=unstatvacc2_group)
+    np.logical_or(unstatvacc2_group, nxd2rx_dat_mask, out=unstatvacc2_group)
+    np.logical_or(unstatvacc2_group, jnd2rx_dat_mask, out=unstatvacc2_group)
+    np.logical_or(unstatvacc2_group, gsd2rx_dat_mask, out=unstatvacc2_group)
+    np.logical_or(unstatvacc2_group, vld2rx_dat_mask, out=unstatvacc2_group)
+    np.logical_not(unstatvacc2_group, out=unstatvacc2_group)
+    np.logical_and(unstatvacc2_group, covax2d_group, out=unstatvacc2_group)
+    df["unstatvacc2_group"] = unstatvacc2_group
+
+    # Patients who are shielding (High Risk from COVID-19)
+    #
+    # IF SHIELD_DAT = NULL                           | Reject | Next
+    # IF SHIELD_DAT <> NULL AND NONSHIELD_DAT = NULL | Select | Next
+    # IF SHIELD_DAT > NONSHIELD_DAT                  | Select | Reject
+    shield_group = np.empty(n, dtype=bool)
+    np.logical_not(nonshield_dat_mask, out=shield_group)
+    np.logical_and(shield_group, shield_dat_mask, out=shield_group)
+    np.greater(shield_dat_ordinals, nonshield_dat_ordinals, out=tmp0)
+    np.logical_or(shield_group, tmp0, out=shield_group)
+    np.logical_and(shield_group, shield_dat_mask, out=shield_group)
+    df["shield_group"] = shield_group
+
+    # Patients who are pregnant
+    #
+    # IF PREG_DAT<> NULL        | Next   | Reject
+    # IF PREGDEL_DAT > PREG_DAT | Reject | Select
+    preg_group = np.empty(n, dtype=bool)
+    np.less_equal(pregdel_dat_ordinals, preg_dat_ordinals, out=preg_group)
+    np.logical_and(preg_group, preg_dat_mask, out=preg_group)
+    df["preg_group"] = preg_group
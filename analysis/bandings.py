@@ -0,0 +1,147 @@
+"""Assignment of patients to age bands, IMD bands and waves.
+
+Each banding is defined once, by a list of breakpoints and the band that lies between
+each pair of consecutive breakpoints.  transform_fast assigns bands to a whole column
+in a single pass with np.searchsorted(), and transform_slow assigns a band to a single
+value with bisect, using the same breakpoints.
+
+Bands are numbered from 1, and 0 means that a value is in no band.  Arrays of bands
+have dtype int8.
+"""
+
+import bisect
+from functools import lru_cache
+
+import numpy as np
+
+from age_bands import age_bands
+
+
+BAND_DTYPE = np.dtype("int8")
+
+# The number of LSOAs in England, which are ranked by IMD from 1 (most deprived)
+NUM_LSOAS = 32844
+
+# IMD band k holds values v where imd_edges[k - 1] < v < imd_edges[k].  The top
+# breakpoint is the largest float below NUM_LSOAS, so that a value of NUM_LSOAS is
+# in no band.  Missing values are in no band.
+imd_edges = [NUM_LSOAS * band / 5 for band in range(5)] + [
+    np.nextafter(NUM_LSOAS, 0)
+]
+imd_bands = [0, 1, 2, 3, 4, 5, 0]
+
+# Waves are numbered in order of priority, so that a patient who qualifies for more
+# than one wave is in the one with the lowest number.  Patients are in the wave given
+# by wave_age_bands[k] for ages from wave_age_edges[k - 1] (inclusive) to
+# wave_age_edges[k] (exclusive), unless they qualify for a wave of higher priority.
+wave_age_edges = [50, 55, 60, 65, 70, 75, 80]
+wave_age_bands = [0, 9, 8, 7, 5, 4, 3, 2]
+
+# Wave 1: Residents in Care Homes
+LONGRES_WAVE = 1
+# Wave 4: Clinically Extremely Vulnerable
+SHIELD_WAVE = 4
+# Wave 6: Age 16-64 in a defined At Risk group
+ATRISK_WAVE = 6
+ATRISK_MIN_AGE = 16
+
+
+def assign_bands(values, edges, bands, side):
+    """Return array of the band of each of values.
+
+    Each value is in bands[k], where k is the number of edges that are less than or
+    equal to the value if side is "right", or that are less than the value if side is
+    "left".
+    """
+
+    return np.asarray(bands, dtype=BAND_DTYPE)[
+        np.searchsorted(edges, values, side=side)
+    ]
+
+
+def assign_band(value, edges, bands, side):
+    """Return the band of value.  See assign_bands()."""
+
+    if side == "right":
+        return bands[bisect.bisect_right(edges, value)]
+    else:
+        return bands[bisect.bisect_left(edges, value)]
+
+
+@lru_cache
+def get_age_band_edges(bands):
+    """Return breakpoints and bands, for assign_bands(), of the given age bands.
+
+    The age bands must be contiguous, and given in increasing order of age.
+    """
+
+    edges = []
+    edge_bands = [0]
+
+    for band in bands:
+        lower, upper = age_bands[band]
+        lower = -np.inf if lower is None else lower
+        upper = np.inf if upper is None else upper
+
+        if not edges:
+            edges.append(lower)
+        elif edges[-1] != lower:
+            raise ValueError(f"Age band {band} does not follow on from previous band")
+
+        edges.append(upper)
+        edge_bands.append(band)
+
+    edge_bands.append(0)
+    return edges, edge_bands
+
+
+def assign_age_bands(ages, bands):
+    edges, edge_bands = get_age_band_edges(bands)
+    return assign_bands(ages, edges, edge_bands, "right")
+
+
+def assign_age_band(age, bands):
+    edges, edge_bands = get_age_band_edges(bands)
+    return assign_band(age, edges, edge_bands, "right")
+
+
+def assign_imd_bands(imds):
+    return assign_bands(imds, imd_edges, imd_bands, "left")
+
+
+def assign_imd_band(imd):
+    return assign_band(imd, imd_edges, imd_bands, "left")
+
+
+def assign_waves(ages, longres, shield, atrisk):
+    """Return array of the wave of each patient, given arrays of ages and of whether
+    each patient is a resident in a care home, is shielding, or is in an at-risk group.
+    """
+
+    waves = assign_bands(ages, wave_age_edges, wave_age_bands, "right")
+    prioritise(waves, shield, SHIELD_WAVE)
+    prioritise(waves, atrisk & (ages >= ATRISK_MIN_AGE), ATRISK_WAVE)
+    waves[longres] = LONGRES_WAVE
+    return waves
+
+
+def assign_wave(age, longres, shield, atrisk):
+    """Return the wave of a single patient.  See assign_waves()."""
+
+    if longres:
+        return LONGRES_WAVE
+
+    wave = assign_band(age, wave_age_edges, wave_age_bands, "right")
+    if shield and (wave == 0 or wave > SHIELD_WAVE):
+        wave = SHIELD_WAVE
+    if atrisk and age >= ATRISK_MIN_AGE and (wave == 0 or wave > ATRISK_WAVE):
+        wave = ATRISK_WAVE
+    return wave
+
+
+def prioritise(bands, mask, band):
+    """Set bands to band where mask holds, in place, unless they are already in a band
+    of higher priority.
+    """
+
+    bands[mask & ((bands == 0) | (bands > band))] = band
@@ -0,0 +1,54 @@
+"""Functions for saving charts as PNG files, and for including them in HTML reports.
+
+Each chart is rendered once, to an in-memory buffer, which is both written to disk
+and base64-encoded, so that reports do not need to read charts back from disk.
+
+Rather than inlining charts, reports can link to chart files, which keeps them small.
+"""
+
+import base64
+import io
+import os
+
+import matplotlib.pyplot as plt
+
+
+def save_chart(path, **kwargs):
+    """Save the current figure to path as a PNG, and return the PNG, base64-encoded.
+
+    kwargs are passed to plt.savefig().
+    """
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", **kwargs)
+    png = buf.getvalue()
+
+    with open(path, "wb") as f:
+        f.write(png)
+
+    return encode_png(png)
+
+
+def encode_png(png):
+    return base64.b64encode(png).decode("utf8")
+
+
+def get_chart_src(path, report_dir, encoded_charts=None, link=False):
+    """Return value of src attribute of img element for the chart at path, in a report
+    in report_dir.
+
+    If link is True, this is the path of the chart relative to report_dir.  Otherwise,
+    it is a data URI containing the base64-encoded chart, which is taken from
+    encoded_charts (a dict mapping paths to encoded charts) if it is there, and which
+    is otherwise read from path.
+    """
+
+    if link:
+        return os.path.relpath(path, report_dir)
+
+    encoded = (encoded_charts or {}).get(path)
+    if encoded is None:
+        with open(path, "rb") as f:
+            encoded = encode_png(f.read())
+
+    return f"data:image/png;base64,{encoded}"
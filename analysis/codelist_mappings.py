@@ -0,0 +1,84 @@
+"""Lookups derived from the groupings in codelists.
+
+Each lookup is loaded and validated at most once per process.  Lookups must not be
+modified by callers.
+"""
+
+import csv
+import functools
+
+import numpy as np
+
+
+eth2001_path = "codelists/primis-covid19-vacc-uptake-eth2001.csv"
+
+# High-level ethnicity of patients whose ethnicity is not in any of the categories in
+# the eth2001 codelist
+unknown_high_level_ethnicity = 6
+
+
+@functools.lru_cache(maxsize=None)
+def load_grouping(path, key_col, value_col):
+    """Return dict mapping each value in key_col of the codelist at path to the
+    corresponding value in value_col.
+
+    Raises ValueError if any value in key_col corresponds to more than one value in
+    value_col.
+    """
+
+    grouping = {}
+
+    with open(path) as f:
+        for record in csv.DictReader(f):
+            key = record[key_col]
+            value = record[value_col]
+            if grouping.setdefault(key, value) != value:
+                raise ValueError(f"{path}: {key_col} {key} is in multiple groupings")
+
+    return grouping
+
+
+@functools.lru_cache(maxsize=None)
+def get_ethnicity_to_high_level_ethnicity():
+    """Return dict mapping ethnicity categories (1-16) to high-level ethnicity
+    categories (1-5).
+    """
+
+    grouping = load_grouping(eth2001_path, "grouping_16_id", "grouping_6_id")
+    mapping = {
+        int(category): int(high_level) for category, high_level in grouping.items()
+    }
+
+    if not all(0 < category < 17 for category in mapping):
+        raise ValueError(f"{eth2001_path}: unexpected ethnicity categories")
+    if not all(0 < high_level < 6 for high_level in mapping.values()):
+        raise ValueError(f"{eth2001_path}: unexpected high-level ethnicity categories")
+
+    return mapping
+
+
+@functools.lru_cache(maxsize=None)
+def get_high_level_ethnicity_lookup():
+    """Return int8 array mapping each ethnicity category to a high-level ethnicity
+    category, so that lookup[ethnicity] is the high-level ethnicity.
+
+    The array has an entry for every non-negative int8, so can be indexed by any
+    ethnicity category, whether a single value or an array of values.  Categories not
+    in the eth2001 codelist map to unknown_high_level_ethnicity.
+    """
+
+    lookup = np.full(np.iinfo("int8").max + 1, unknown_high_level_ethnicity, "int8")
+    for category, high_level in get_ethnicity_to_high_level_ethnicity().items():
+        lookup[category] = high_level
+    lookup.flags.writeable = False
+    return lookup
+
+
+@functools.lru_cache(maxsize=None)
+def get_high_level_ethnicity_labels():
+    """Return dict mapping high-level ethnicity categories to labels."""
+
+    grouping = load_grouping(eth2001_path, "grouping_6_id", "grouping_6_label")
+    labels = {int(high_level): label for high_level, label in grouping.items()}
+    labels[unknown_high_level_ethnicity] = "Unknown"
+    return labels
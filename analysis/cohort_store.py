@@ -0,0 +1,79 @@
+"""Functions for writing and reading the transformed cohort.
+
+The cohort is stored as a Parquet file, so that downstream actions can load just the
+columns that they need.  It is written in row groups, so that it can be written one
+chunk at a time, without holding the whole cohort in memory.
+
+The index of the cohort is not stored.
+
+The group columns may be stored packed into a single column of flags (see
+group_flags.py).  read_cohort() unpacks any group columns that are requested from such
+a cohort.
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pandas as pd
+
+from group_flags import FLAGS_COL, flag_cols, unpack
+
+
+ROW_GROUP_SIZE = 1_000_000
+
+
+def write_cohort(cohort, path):
+    write_cohort_in_chunks([cohort], path)
+
+
+def write_cohort_in_chunks(chunks, path):
+    """Write cohort, given as an iterable of DataFrames with the same columns and
+    dtypes, to path.
+    """
+
+    writer = None
+
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, schema)
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    assert writer is not None, "No chunks to write"
+
+
+def read_cohort(path, columns=None):
+    """Read cohort from path, loading only the given columns if provided.
+
+    If the group columns are stored as packed flags, any requested group columns are
+    unpacked from them.
+    """
+
+    if columns is None:
+        return pd.read_parquet(path)
+
+    stored_columns = read_cohort_columns(path)
+    packed_cols = [
+        col for col in columns if col in flag_cols and col not in stored_columns
+    ]
+    if not packed_cols or FLAGS_COL not in stored_columns:
+        return pd.read_parquet(path, columns=columns)
+
+    read_columns = [col for col in columns if col not in packed_cols]
+    if FLAGS_COL not in read_columns:
+        read_columns.append(FLAGS_COL)
+    cohort = pd.read_parquet(path, columns=read_columns)
+
+    for col, values in unpack(cohort[FLAGS_COL].values, packed_cols).items():
+        cohort[col] = values
+    return cohort[columns]
+
+
+def read_cohort_columns(path):
+    """Return names of columns of cohort stored at path, without loading any data."""
+
+    return pq.read_schema(path).names
@@ -1,35 +1,38 @@
+import numpy as np
 import pandas as pd
 
 
-def combine_cumsums(df1, df2):
-    df1 = df1.copy()
-    df2 = df2.copy()
-    for col in df1.columns:
-        if col not in df2.columns:
-            df2[col] = 0
-    for col in df2.columns:
-        if col not in df1.columns:
-            df1[col] = 0
+def combine_cumsums(*dfs):
+    """Return DataFrame giving the sum of DataFrames of cumulative counts, such as
+    those returned by compute_uptake().
 
-    dates1 = list(df1.index)[:-1]
-    earliest1, latest1 = min(dates1), max(dates1)
-    dates2 = list(df2.index)[:-1]
-    earliest2, latest2 = min(dates2), max(dates2)
+    Each DataFrame is indexed by date, with a final "total" row.  The combined
+    DataFrame has a row for every date between the earliest and latest date of any of
+    the DataFrames, and a column for each column of any of the DataFrames.  Before its
+    earliest date, a DataFrame contributes nothing to the sum, and after its latest
+    date, it contributes its counts for its latest date.
+    """
 
-    earliest, latest = min(earliest1, earliest2), max(latest1, latest2)
-    index = [str(date.date()) for date in pd.date_range(earliest, latest)] + ["total"]
+    columns = list(dict.fromkeys(col for df in dfs for col in df.columns))
 
-    df = pd.DataFrame(index=index, columns=df1.columns).fillna(0).astype(int)
+    earliest = min(min(df.index[:-1]) for df in dfs)
+    latest = max(max(df.index[:-1]) for df in dfs)
+    index = list(pd.date_range(earliest, latest).strftime("%Y-%m-%d")) + ["total"]
 
-    for date in index:
-        if date in df1.index:
-            df.loc[date] += df1.loc[date]
-        elif date > latest1:
-            df.loc[date] += df1.loc[latest1]
+    values = np.sum([align_cumsum(df, index, columns) for df in dfs], axis=0)
+    return pd.DataFrame(values, index=index, columns=columns)
 
-        if date in df2.index:
-            df.loc[date] += df2.loc[date]
-        elif date > latest2:
-            df.loc[date] += df2.loc[latest2]
 
-    return df
+def align_cumsum(df, index, columns):
+    """Return array of values of df reindexed by index and columns, with the counts
+    for the latest date of df carried forward to all later dates.
+    """
+
+    latest = max(df.index[:-1])
+    values = df.reindex(index=index, columns=columns, fill_value=0).to_numpy()
+
+    # Dates are strings in ISO format, so can be compared as strings
+    after_latest = np.array(index[:-1]) > latest
+    values[:-1][after_latest] = values[index.index(latest)]
+
+    return values
@@ -1,23 +1,147 @@
 import glob
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pandas as pd
 
 from combine_cumsums import combine_cumsums
 
 
-def run():
-    for emis_path in sorted(
-        glob.glob("released_outputs/emis/cumulative_coverage/*/*/*.csv")
-    ):
-        print(emis_path)
-        tpp_path = emis_path.replace("/emis/", "/tpp/")
-        emis_df = pd.read_csv(emis_path, index_col=0)
-        tpp_df = pd.read_csv(tpp_path, index_col=0)
-        combined_df = combine_cumsums(emis_df, tpp_df)
-        combined_path = emis_path.replace("/emis/", "/combined/")
-        os.makedirs(os.path.dirname(combined_path), exist_ok=True)
-        combined_df.to_csv(combined_path)
+default_backend_dirs = ["released_outputs/emis", "released_outputs/tpp"]
+default_output_dir = "released_outputs/combined"
+
+# How to handle an output that is missing from some backend directories:
+#
+#   error: raise FileNotFoundError
+#   skip_file: do not write a combined output
+#   skip_backend: combine the outputs from the backend directories that have it
+on_missing_choices = ["error", "skip_file", "skip_backend"]
+
+
+def run(
+    backend_dirs=default_backend_dirs,
+    output_dir=default_output_dir,
+    on_missing="error",
+):
+    for path, dirs in get_output_paths(backend_dirs, on_missing):
+        print(path)
+        dfs = read_backend_outputs(path, dirs)
+        combined_df = combine_cumsums(*dfs)
+        write_combined_output(output_dir, path, combined_df)
+
+
+def run_batch(
+    backend_dirs=default_backend_dirs,
+    output_dir=default_output_dir,
+    on_missing="error",
+    processes=None,
+    threads=8,
+):
+    """Combine all outputs, as run() does, but concurrently.
+
+    Each output is handled by a task in a pool of threads, which reads the output from
+    each backend directory, has it combined by a pool of processes, and writes the
+    combined output.  So at most one output per thread is held in memory at once, and
+    each output is written as soon as it has been combined.  Only a summary is
+    printed, once all outputs have been written.
+    """
+
+    start = time.perf_counter()
+    paths_and_dirs = get_output_paths(backend_dirs, on_missing)
+
+    with ThreadPoolExecutor(threads) as io_pool, ProcessPoolExecutor(
+        processes
+    ) as combine_pool:
+
+        def combine_output(path, dirs):
+            dfs = read_backend_outputs(path, dirs)
+            combined_df = combine_pool.submit(combine_all, dfs).result()
+            return write_combined_output(output_dir, path, combined_df)
+
+        writes = [
+            io_pool.submit(combine_output, path, dirs) for path, dirs in paths_and_dirs
+        ]
+        num_rows = sum(write.result() for write in writes)
+
+    elapsed = time.perf_counter() - start
+    print(f"Combined {len(writes)} files ({num_rows} rows) in {elapsed:.1f}s")
+
+
+def get_output_paths(backend_dirs, on_missing):
+    """Return list of pairs of path of output, relative to a backend directory, and
+    list of backend directories to combine the output from.
+
+    Outputs in any of the backend directories are included, subject to on_missing.
+    """
+
+    assert on_missing in on_missing_choices, on_missing
+
+    paths_by_dir = {
+        backend_dir: {
+            os.path.relpath(path, backend_dir)
+            for path in glob.glob(f"{backend_dir}/cumulative_coverage/*/*/*.csv")
+        }
+        for backend_dir in backend_dirs
+    }
+    all_paths = sorted(set.union(*paths_by_dir.values()))
+
+    paths_and_dirs = []
+    for path in all_paths:
+        dirs = [d for d in backend_dirs if path in paths_by_dir[d]]
+        if len(dirs) < len(backend_dirs):
+            if on_missing == "error":
+                missing = [d for d in backend_dirs if d not in dirs]
+                raise FileNotFoundError(f"{path} missing from {', '.join(missing)}")
+            if on_missing == "skip_file":
+                continue
+        paths_and_dirs.append((path, dirs))
+
+    return paths_and_dirs
+
+
+def read_backend_outputs(path, backend_dirs):
+    return [pd.read_csv(f"{d}/{path}", index_col=0) for d in backend_dirs]
+
+
+def combine_all(dfs):
+    return combine_cumsums(*dfs)
+
+
+def write_combined_output(output_dir, path, combined_df):
+    """Write combined_df to path within output_dir, and return the number of rows
+    written.
+    """
+
+    combined_path = f"{output_dir}/{path}"
+    os.makedirs(os.path.dirname(combined_path), exist_ok=True)
+    combined_df.to_csv(combined_path)
+    return len(combined_df)
 
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("backend_dirs", nargs="*", default=default_backend_dirs)
+    parser.add_argument("--output-dir", default=default_output_dir)
+    parser.add_argument("--on-missing", choices=on_missing_choices, default="error")
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(
+            backend_dirs=args.backend_dirs,
+            output_dir=args.output_dir,
+            on_missing=args.on_missing,
+            processes=args.processes,
+            threads=args.threads,
+        )
+    else:
+        run(
+            backend_dirs=args.backend_dirs,
+            output_dir=args.output_dir,
+            on_missing=args.on_missing,
+        )
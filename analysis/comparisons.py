@@ -30,20 +30,48 @@ And the patient should not be assigned to DIAB_GROUP if one of:
     * DIAB_DAT and DMRES_DAT are both null
 
 As such, we need the functions below, which handle NaN values correctly.
+
+These functions also handle dates that are encoded as day offsets (see
+day_offsets.py), where missing dates are represented by a value that is less than
+every other day.  This means that (for instance) a missing rhs is always less than a
+non-missing lhs, so that some comparisons need no special handling.
+
+Only date columns (whose names end in "_dat", as with day_offsets.encode_dates()) are
+treated as day offsets.  Other int16 columns, such as age, are compared as ordinary
+values.
 """
 
+from day_offsets import is_day_offset, notnull
+
+
+def are_day_offsets(lhs, rhs):
+    """Return whether lhs and rhs are both date columns encoded as day offsets."""
+
+    return all(
+        is_day_offset(series) and str(series.name).endswith("_dat")
+        for series in [lhs, rhs]
+    )
+
 
 def gt(lhs, rhs):
+    if are_day_offsets(lhs, rhs):
+        return lhs > rhs
     return (lhs > rhs) | (lhs.notna() & rhs.isna())
 
 
 def gte(lhs, rhs):
+    if are_day_offsets(lhs, rhs):
+        return (lhs >= rhs) & notnull(lhs)
     return (lhs >= rhs) | (lhs.notna() & rhs.isna())
 
 
 def lt(lhs, rhs):
+    if are_day_offsets(lhs, rhs):
+        return lhs < rhs
     return (lhs < rhs) | (lhs.isna() & rhs.notna())
 
 
 def lte(lhs, rhs):
+    if are_day_offsets(lhs, rhs):
+        return (lhs <= rhs) & notnull(rhs)
     return (lhs <= rhs) | (lhs.isna() & rhs.notna())
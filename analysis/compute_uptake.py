@@ -1,59 +1,216 @@
 import os
+
+import numpy as np
 import pandas as pd
 
+from cohort_store import read_cohort, read_cohort_columns
+from day_offsets import EPOCH, to_days
+from group_flags import FLAGS_COL, in_groups
 from groups import groups
 
 
-def run(input_path="output/cohort.pickle", output_dir="output"):
+def run(input_path="output/cohort.parquet", output_dir="output"):
     """Produce dataframes computing uptake stratified by age band, sex, and high-level
     ethnicity codes, for the whole population and for each clinical subgroup in the
     PRIMIS spec.
+
+    If the group columns are packed into flags (see group_flags.py), only the flags
+    are loaded, and patients in each group are found from them.
     """
 
     backend = os.getenv("OPENSAFELY_BACKEND", "expectations")
 
-    cohort = pd.read_pickle(input_path)
     demographic_cols = ["age_band", "sex", "high_level_ethnicity"]
     group_cols = [
         group for group in groups if "covax" not in group and "unstatvacc" not in group
     ]
+    if FLAGS_COL in read_cohort_columns(input_path):
+        cols = ["vacc1_dat"] + demographic_cols + [FLAGS_COL]
+    else:
+        cols = ["vacc1_dat"] + demographic_cols + group_cols
+    cohort = read_cohort(input_path, cols)
 
     for col in demographic_cols:
         path = f"{output_dir}/coverage_by_{col}_{backend}.csv"
         compute_uptake(cohort, "vacc1_dat", col).to_csv(path)
 
         for group_col in group_cols:
-            group_cohort = cohort[cohort[group_col]]
+            group_cohort = cohort[in_groups(cohort, [group_col])]
             path = f"{output_dir}/coverage_for_{group_col}_by_{col}_{backend}.csv"
             compute_uptake(group_cohort, "vacc1_dat", col).to_csv(path)
 
+    days, has_event = to_days(cohort["vacc1_dat"])
     for col in group_cols:
         path = f"{output_dir}/coverage_by_{col}_{backend}.csv"
-        compute_uptake(cohort, "vacc1_dat", col).to_csv(path)
+        codes, vals = factorize(pd.Series(in_groups(cohort, [col]), name=col))
+        compute_uptake_from_arrays(codes, vals, days, has_event).to_csv(path)
 
 
 def compute_uptake(cohort, event_col, stratification_col):
-    stratification_series = cohort[stratification_col]
-    stratification_vals = sorted(stratification_series.value_counts().index)
+    """Return DataFrame of cumulative counts of patients with an event in event_col,
+    indexed by date, with a column for each value of stratification_col.  The final
+    row of the DataFrame gives the number of patients with each value.
+
+    All counts are computed in a single pass over the cohort: each patient with an
+    event is assigned to a cell in a (stratification value, day) grid, which is then
+    counted with np.bincount and summed cumulatively along the day axis.
+    """
+
+    codes, stratification_vals = factorize(cohort[stratification_col])
+    days, has_event = to_days(cohort[event_col])
+    return compute_uptake_from_arrays(codes, stratification_vals, days, has_event)
+
+
+def compute_uptake_from_arrays(codes, stratification_vals, days, has_event):
+    """Return DataFrame as described in compute_uptake(), from arrays of codes and
+    days, as returned by factorize() and day_offsets.to_days().
+    """
 
-    event_dates = cohort[cohort[event_col].notnull()][event_col]
-    if event_dates.empty:
+    if not has_event.any():
         return
 
-    earliest, latest = min(event_dates), max(event_dates)
-    index = [str(date.date()) for date in pd.date_range(earliest, latest)]
+    earliest, latest = days[has_event].min(), days[has_event].max()
+    num_days = latest - earliest + 1
+    num_vals = len(stratification_vals)
+
+    counts = count_cells(codes, num_vals, days - earliest, num_days, has_event)
+    totals = np.bincount(codes[codes >= 0], minlength=num_vals)
+    return build_uptake(counts, totals, stratification_vals, earliest)
+
+
+def compute_uptake_cube(cohort, event_cols, partition_col, stratification_cols):
+    """Return dict mapping (event_col, stratification_col, partition_val) to the
+    DataFrame returned by:
+
+        compute_uptake(
+            cohort[cohort[partition_col] == partition_val],
+            event_col,
+            stratification_col,
+        )
+
+    Entries for which compute_uptake would return None are omitted.
+
+    Rather than filtering the cohort for each partition, each column is converted to
+    codes or days once, and the counts for each pair of event_col and
+    stratification_col are computed for all partitions with a single bincount over
+    the (partition, stratification value, day) grid.
+    """
 
-    uptake = pd.DataFrame(index=index)
+    events = {event_col: to_days(cohort[event_col]) for event_col in event_cols}
+    partition = factorize(cohort[partition_col])
+    stratifications = {col: factorize(cohort[col]) for col in stratification_cols}
+    return compute_uptake_cube_from_arrays(events, partition, stratifications)
 
-    for stratification_val in stratification_vals:
-        filtered = cohort[stratification_series == stratification_val]
-        series = pd.Series(0, index=index)
-        for date, count in filtered[event_col].value_counts().iteritems():
-            series[str(date.date())] = count
-        uptake[stratification_val] = series.cumsum()
 
-    uptake.loc["total"] = stratification_series.value_counts()
-    uptake.fillna(0, inplace=True)
+def compute_uptake_cube_from_arrays(events, partition, stratifications):
+    """Return dict as described in compute_uptake_cube(), from arrays of codes and
+    days.
+
+    events maps each event column to a pair of arrays as returned by
+    day_offsets.to_days(), and partition and stratifications (which maps each
+    stratification column) are pairs of codes and values as returned by factorize().
+    """
+
+    partition_codes, partition_vals = partition
+    partition_codes = partition_codes.astype("int64")
+    num_partitions = len(partition_vals)
+
+    combined = {}
+    for stratification_col, (codes, vals) in stratifications.items():
+        # Combine partition and stratification codes, so that each combination of
+        # partition and stratification value has its own code.
+        combined_codes = np.where(
+            (partition_codes >= 0) & (codes >= 0),
+            partition_codes * len(vals) + codes,
+            -1,
+        )
+        totals = np.bincount(
+            combined_codes[combined_codes >= 0], minlength=num_partitions * len(vals)
+        ).reshape(num_partitions, len(vals))
+        combined[stratification_col] = (combined_codes, vals, totals)
+
+    cube = {}
+
+    for event_col, (days, has_event) in events.items():
+        if not has_event.any():
+            continue
+
+        earliest, latest = days[has_event].min(), days[has_event].max()
+        num_days = latest - earliest + 1
+        days = days - earliest
+
+        # The range of dates for each partition is determined by all patients in the
+        # partition, whether or not their stratification value is missing.
+        partition_event_counts = count_cells(
+            partition_codes, num_partitions, days, num_days, has_event
+        )
+
+        for stratification_col, (combined_codes, vals, totals) in combined.items():
+            counts = count_cells(
+                combined_codes, num_partitions * len(vals), days, num_days, has_event
+            ).reshape(num_partitions, len(vals), num_days)
+
+            for ix, partition_val in enumerate(partition_vals):
+                event_days = np.flatnonzero(partition_event_counts[ix])
+                if len(event_days) == 0:
+                    continue
+
+                first_day, last_day = event_days[0], event_days[-1]
+                cube[(event_col, stratification_col, partition_val)] = build_uptake(
+                    counts[ix, :, first_day : last_day + 1],
+                    totals[ix],
+                    vals,
+                    earliest + first_day,
+                )
+
+    return cube
+
+
+def factorize(series):
+    """Return array of codes of values in series, and list of the distinct values,
+    in sorted order.  Missing values have code -1.
+    """
+
+    codes, vals = pd.factorize(series, sort=True)
+    return codes, list(vals)
+
+
+def count_cells(codes, num_codes, days, num_days, mask):
+    """Return (num_codes, num_days) array of counts of patients by code and day.
+
+    Only patients for which mask is True and whose code is not missing (-1) are
+    counted.  days must be offsets from the first day to be counted.
+    """
+
+    mask = mask & (codes >= 0)
+    # Codes may be stored in a narrow dtype, so are widened before being combined
+    cells = codes[mask].astype("int64") * num_days + days[mask]
+    return np.bincount(cells, minlength=num_codes * num_days).reshape(
+        num_codes, num_days
+    )
+
+
+def build_uptake(counts, totals, stratification_vals, earliest):
+    """Return uptake DataFrame, as described in compute_uptake(), from array of counts
+    by stratification value and day, and array of totals by stratification value.
+    earliest is the day (see day_offsets.to_days()) of the first column of counts.
+    """
+
+    # Categorical columns may have categories with no patients in this cohort
+    present = totals > 0
+    stratification_vals = [
+        val for val, is_present in zip(stratification_vals, present) if is_present
+    ]
+    cumulative_counts = counts[present].cumsum(axis=1)
+
+    num_days = counts.shape[1]
+    dates = pd.date_range(EPOCH + earliest, periods=num_days)
+    index = list(dates.strftime("%Y-%m-%d")) + ["total"]
+    uptake = pd.DataFrame(
+        np.vstack([cumulative_counts.T, totals[present]]),
+        index=index,
+        columns=stratification_vals,
+    )
     return ((uptake // 7) * 7).astype(int)
 
 
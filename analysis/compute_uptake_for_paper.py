@@ -1,7 +1,16 @@
+import multiprocessing
 import os
-import pandas as pd
+import tempfile
 
-from compute_uptake import compute_uptake
+import numpy as np
+
+from cohort_store import read_cohort
+from compute_uptake import (
+    compute_uptake_cube_from_arrays,
+    compute_uptake_from_arrays,
+    factorize,
+)
+from day_offsets import to_days
 from groups import at_risk_groups
 
 
@@ -17,35 +26,130 @@ other_cols = ["shield_group", "bmi_group", "preg_group"]
 cols = demographic_cols + at_risk_cols + other_cols
 
 
-def run(input_path="output/cohort.pickle", output_dir="output"):
+event_cols_and_keys = [
+    ("vacc1_dat", "dose_1"),
+    ("vacc2_dat", "dose_2"),
+    ("pfd1rx_dat", "pf"),
+    ("azd1rx_dat", "az"),
+]
+
+
+def run(input_path="output/cohort.parquet", output_dir="output", processes=None):
+    """Write uptake tables for each dose, stratified by wave, and for each wave,
+    stratified by each of cols.
+
+    If processes is given, the tables are computed by a pool of that many worker
+    processes, each of which computes the tables for one pair of event column and
+    column at a time.  The cohort is not passed to the workers.  Instead, it is encoded
+    as arrays of codes and days, which are saved to a temporary directory and then
+    memory-mapped by each worker, so that all workers share a single copy.
+    """
+
     backend = os.getenv("OPENSAFELY_BACKEND", "expectations")
     base_path = f"{output_dir}/{backend}/cumulative_coverage"
-    cohort = pd.read_pickle(input_path)
-
-    for event_col, key in [
-        ("vacc1_dat", "dose_1"),
-        ("vacc2_dat", "dose_2"),
-        ("pfd1rx_dat", "pf"),
-        ("azd1rx_dat", "az"),
-    ]:
-        # Compute uptake by wave
-        dir_path = f"{base_path}/all/{key}"
-        os.makedirs(dir_path, exist_ok=True)
-        uptake = compute_uptake(cohort, event_col, "wave")
-        uptake.to_csv(f"{dir_path}/all_{key}_by_group.csv")
-
-        # For each wave, compute uptake by column
+    event_cols = [event_col for event_col, _ in event_cols_and_keys]
+    cohort = read_cohort(input_path, ["wave"] + event_cols + cols)
+    arrays, vals = encode_cohort(cohort, event_cols, ["wave"] + cols)
+    del cohort
+
+    for _, key in event_cols_and_keys:
+        os.makedirs(f"{base_path}/all/{key}", exist_ok=True)
         for wave in range(1, 9 + 1):
-            os.makedirs(dir_path, exist_ok=True)
-            wave_cohort = cohort[cohort["wave"] == wave]
-            for col in cols:
-                dir_path = f"{base_path}/group_{wave}/{key}"
-                os.makedirs(dir_path, exist_ok=True)
-                uptake = compute_uptake(wave_cohort, event_col, col)
-                if uptake is None:
-                    continue
-                uptake.to_csv(f"{dir_path}/group_{wave}_{key}_by_{col}.csv")
+            os.makedirs(f"{base_path}/group_{wave}/{key}", exist_ok=True)
+
+    tasks = [
+        (base_path, event_col, key, col, vals)
+        for event_col, key in event_cols_and_keys
+        for col in ["wave"] + cols
+    ]
+
+    if processes is None:
+        for task in tasks:
+            write_uptake(arrays, *task)
+        return
+
+    with tempfile.TemporaryDirectory() as arrays_dir:
+        for name, array in arrays.items():
+            np.save(os.path.join(arrays_dir, f"{name}.npy"), array)
+        with multiprocessing.Pool(
+            processes, initializer=load_arrays, initargs=(arrays_dir, list(arrays))
+        ) as pool:
+            pool.starmap(write_uptake_in_worker, tasks)
+
+
+def encode_cohort(cohort, event_cols, stratification_cols):
+    """Return dict of arrays encoding the given columns of cohort, and dict mapping
+    each stratification column to its values.
+
+    Each event column is encoded as an array of days and a mask indicating which days
+    are not missing, and each stratification column is encoded as an array of codes,
+    in the narrowest dtype that will hold them.
+    """
+
+    arrays = {}
+    vals = {}
+
+    for event_col in event_cols:
+        days, has_event = to_days(cohort[event_col])
+        arrays[f"{event_col}_days"] = days.astype("int32")
+        arrays[f"{event_col}_mask"] = has_event
+
+    for col in stratification_cols:
+        codes, vals[col] = factorize(cohort[col])
+        # The dtype must be signed, to hold the code of missing values (-1), even if
+        # there are no other values
+        dtype = np.min_scalar_type(-max(len(vals[col]), 1))
+        arrays[f"{col}_codes"] = codes.astype(dtype)
+
+    return arrays, vals
+
+
+def write_uptake(arrays, base_path, event_col, key, col, vals):
+    """Write uptake tables for event_col, stratified by col.
+
+    If col is "wave", a single table for the whole cohort is written.  Otherwise, a
+    table is written for each wave.
+    """
+
+    events = {event_col: (arrays[f"{event_col}_days"], arrays[f"{event_col}_mask"])}
+    waves = (arrays["wave_codes"], vals["wave"])
+
+    if col == "wave":
+        uptake = compute_uptake_from_arrays(*waves, *events[event_col])
+        uptake.to_csv(f"{base_path}/all/{key}/all_{key}_by_group.csv")
+        return
+
+    stratification = (arrays[f"{col}_codes"], vals[col])
+    cube = compute_uptake_cube_from_arrays(events, waves, {col: stratification})
+
+    for wave in range(1, 9 + 1):
+        uptake = cube.get((event_col, col, wave))
+        if uptake is None:
+            continue
+        dir_path = f"{base_path}/group_{wave}/{key}"
+        uptake.to_csv(f"{dir_path}/group_{wave}_{key}_by_{col}.csv")
+
+
+# Arrays memory-mapped by each worker process, set by load_arrays()
+_arrays = None
+
+
+def load_arrays(arrays_dir, names):
+    global _arrays
+    _arrays = {
+        name: np.load(os.path.join(arrays_dir, f"{name}.npy"), mmap_mode="r")
+        for name in names
+    }
+
+
+def write_uptake_in_worker(*task):
+    write_uptake(_arrays, *task)
 
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int)
+    args = parser.parse_args()
+    run(processes=args.processes)
@@ -2,37 +2,70 @@ import os
 
 import pandas as pd
 
+from cohort_store import read_cohort, read_cohort_columns
+from group_flags import FLAGS_COL, count_each_group_by, flag_cols
 
-def run(input_path="output/cohort.pickle", output_path="output/prevalences.pickle"):
+
+def run(input_path="output/cohort.parquet", output_path="output/prevalences.pickle"):
     backend = os.getenv("OPENSAFELY_BACKEND", "expectations")
     output_path = output_path[:-7] + f"_{backend}" + ".pickle"
 
-    cohort = pd.read_pickle(input_path)
+    columns = read_cohort_columns(input_path)
+    group_cols = [col for col in columns if col.endswith("_group")]
+    if FLAGS_COL in columns:
+        group_cols.append(FLAGS_COL)
+    cohort = read_cohort(
+        input_path,
+        ["patient_id", "age_band", "sex", "high_level_ethnicity"] + group_cols,
+    )
     prevalences = count_prevalences(cohort)
     prevalences.to_pickle(output_path)
 
 
 def count_prevalences(cohort):
-    prevalences = pd.DataFrame(
-        {"total": cohort.groupby(["age_band", "sex"])["patient_id"].count()}
-    )
+    """Return DataFrame of counts of patients, indexed by age_band and sex, with a
+    column for the total, for each clinical group, and for each high-level ethnicity.
+
+    All counts are computed with a single groupby, summing a boolean indicator column
+    for each count.  If the group columns are packed into flags (see group_flags.py),
+    they are counted directly from the flags, without being unpacked.
+    """
+
+    indicators = {"total": cohort["patient_id"].notnull()}
 
     for col in cohort.columns:
         if not col.endswith("_group"):
             continue
 
-        prevalences[col] = (
-            cohort[cohort[col]].groupby(["age_band", "sex"])["patient_id"].count()
-        )
+        indicators[col] = cohort[col]
 
     for high_level_ethnicity_category in [1, 2, 3, 4, 5, 6]:
-        prevalences[f"ethnicity_{high_level_ethnicity_category}"] = (
-            cohort[cohort["high_level_ethnicity"] == high_level_ethnicity_category]
-            .groupby(["age_band", "sex"])["patient_id"]
-            .count()
+        indicators[f"ethnicity_{high_level_ethnicity_category}"] = (
+            cohort["high_level_ethnicity"] == high_level_ethnicity_category
         )
 
-    prevalences.fillna(0, inplace=True)
+    # sex is categorical, so we only count combinations of age_band and sex that are
+    # present in the cohort, as we do for other dtypes
+    grouped = pd.DataFrame(indicators).groupby(
+        [cohort["age_band"], cohort["sex"]], observed=True
+    )
+    prevalences = grouped.sum()
+
+    if FLAGS_COL in cohort.columns:
+        counts = count_each_group_by(
+            cohort[FLAGS_COL].values, grouped.ngroup().values, grouped.ngroups
+        )
+        prevalences = pd.concat(
+            [
+                prevalences[["total"]],
+                pd.DataFrame(counts, index=prevalences.index, columns=flag_cols),
+                prevalences.drop(columns="total"),
+            ],
+            axis=1,
+        )
+
+    prevalences = prevalences.sort_index()
+
     return ((prevalences // 7) * 7).astype(int)
 
 
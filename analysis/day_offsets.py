@@ -0,0 +1,121 @@
+"""Compact representation of dates as int16 day offsets.
+
+Each of the ~60 date columns in the cohort takes 8 bytes per patient when stored as
+datetime64[ns].  Storing dates instead as the number of days since EPOCH in an int16
+takes a quarter of the space.
+
+Missing dates are represented by NULL_DAY, which is less than every other day.  This
+means that some of the comparisons in comparisons.py need no special handling for
+missing values.  For instance, gt(lhs, rhs) is simply lhs > rhs.
+
+With an epoch of 1970-01-01, int16 day offsets can represent dates between April 1880
+and September 2059, which includes all placeholder dates (such as 1900-01-01) that we
+see in the data.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+EPOCH = np.datetime64("1970-01-01", "D")
+DTYPE = np.dtype("int16")
+NULL_DAY = np.iinfo(DTYPE).min
+MIN_DAY = NULL_DAY + 1
+MAX_DAY = np.iinfo(DTYPE).max
+
+
+def is_day_offset(series):
+    """Return whether series holds dates encoded as day offsets."""
+
+    return series.dtype == DTYPE
+
+
+def isnull(series):
+    if is_day_offset(series):
+        return series == NULL_DAY
+    return series.isnull()
+
+
+def notnull(series):
+    if is_day_offset(series):
+        return series != NULL_DAY
+    return series.notnull()
+
+
+def encode(series):
+    """Encode Series of datetime64 as Series of day offsets."""
+
+    mask = series.isnull().values
+    days = (series.values.astype("datetime64[D]") - EPOCH).astype("int64")
+    days[mask] = NULL_DAY
+
+    if ((days[~mask] < MIN_DAY) | (days[~mask] > MAX_DAY)).any():
+        raise ValueError(f"{series.name} contains dates that cannot be encoded")
+
+    return pd.Series(days.astype(DTYPE), index=series.index, name=series.name)
+
+
+def decode(series):
+    """Decode Series of day offsets as Series of datetime64."""
+
+    mask = (series == NULL_DAY).values
+    dates = (EPOCH + series.values.astype("int64")).astype("datetime64[ns]")
+    dates[mask] = np.datetime64("NaT")
+    return pd.Series(dates, index=series.index, name=series.name)
+
+
+def to_days(series):
+    """Return array of days since EPOCH for Series of datetime64 or of day offsets,
+    and boolean array indicating which dates are not missing.
+    """
+
+    if is_day_offset(series):
+        days = series.values.astype("int64")
+        return days, days != NULL_DAY
+
+    days = (series.values.astype("datetime64[D]") - EPOCH).astype("int64")
+    return days, series.notnull().values
+
+
+def to_ordinals(series):
+    """Return array of integers that are ordered like the dates in Series of datetime64
+    or of day offsets, and boolean array indicating which dates are not missing.
+
+    Missing dates are less than every other date.  Unlike to_days(), this does not copy
+    or convert the underlying data, but the integers are only comparable with those
+    from a Series with the same dtype, or with those of a Series of missing dates.
+    """
+
+    null_ordinal = np.iinfo("int64").min
+
+    if is_day_offset(series):
+        ordinals = series.values
+        return ordinals, ordinals != NULL_DAY
+
+    if pd.api.types.is_datetime64_dtype(series):
+        # NaT is stored as the smallest int64
+        ordinals = series.values.view("int64")
+        return ordinals, ordinals != null_ordinal
+
+    # Columns where every date is missing may not have a date dtype (for instance,
+    # placeholder columns added by transform_fast.add_missing_vacc_columns())
+    if series.isnull().all():
+        return np.full(len(series), null_ordinal), np.zeros(len(series), dtype=bool)
+
+    raise TypeError(f"{series.name} does not contain dates")
+
+
+def encode_dates(df):
+    """Encode all date columns of df as day offsets, in place."""
+
+    for col in df.columns:
+        if col.endswith("_dat") and pd.api.types.is_datetime64_dtype(df[col]):
+            df[col] = encode(df[col])
+
+
+def decode_dates(df):
+    """Decode all date columns of df that are encoded as day offsets, in place."""
+
+    for col in df.columns:
+        if col.endswith("_dat") and is_day_offset(df[col]):
+            df[col] = decode(df[col])
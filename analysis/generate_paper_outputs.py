@@ -1,20 +1,23 @@
-import base64
+import json
+import multiprocessing
 import os
 from datetime import datetime, timedelta
 
-import jinja2
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FixedFormatter, PercentFormatter
 from matplotlib.dates import TU, WeekdayLocator
 import pandas as pd
 
+from chart_images import get_chart_src, save_chart
 from compute_uptake_for_paper import at_risk_cols, cols, demographic_cols, other_cols
 from ethnicities import ethnicities, high_level_ethnicities
 from groups import groups, at_risk_groups
+from manifest import Manifest, compute_digest
+from templating import render_template
 
 # Ensure SVGs are created reproducibly
-mpl.rcParams["svg.hashsalt"] = 42
+mpl.rcParams["svg.hashsalt"] = "42"
 
 wave_column_headings = {
     "total": "All",
@@ -40,7 +43,49 @@ class IntArrayFormatter(pd.io.formats.format.GenericArrayFormatter):
 pd.io.formats.format.IntArrayFormatter = IntArrayFormatter
 
 
-def run(base_path, earliest_date, latest_date):
+# Modules that outputs are generated with, whether by computing tables, plotting charts,
+# rendering reports, or providing labels
+source_modules = [
+    "generate_paper_outputs",
+    "chart_images",
+    "templating",
+    "compute_uptake_for_paper",
+    "ethnicities",
+    "groups",
+]
+
+
+def run(
+    base_path,
+    earliest_date,
+    latest_date,
+    processes=None,
+    force=False,
+    link_charts=False,
+    chart_format="png",
+):
+    """Generate summary tables, charts, and reports from the cumulative coverage
+    outputs in base_path.
+
+    Charts are rendered by a pool of processes (see render_charts()) once all tables
+    have been generated, and reports are generated once all charts have been rendered.
+
+    Tables, charts, and reports whose inputs have not changed since they were last
+    generated are skipped, according to a manifest stored in base_path, unless force
+    is True.  The inputs include the source of the modules and templates that the
+    outputs are generated with (see get_source_paths()), so editing any of them causes
+    all outputs to be regenerated.
+
+    Reports include charts inline, unless link_charts is True, in which case they link
+    to the chart files.
+
+    If chart_format is "json", charts are not rendered with matplotlib.  Instead, the
+    data for each chart is written as a JSON document (see write_chart_spec()), and is
+    included in reports, which render it client-side.
+    """
+
+    assert chart_format in ["png", "json"], chart_format
+
     backend = base_path.rstrip("/").split("/")[-1]
     titles = get_titles()
     label_maps = get_label_maps()
@@ -52,63 +97,184 @@ def run(base_path, earliest_date, latest_date):
     os.makedirs(charts_path, exist_ok=True)
     os.makedirs(reports_path, exist_ok=True)
 
-    for key in ["dose_1", "dose_2", "pf", "az"]:
-        in_path = f"{base_path}/cumulative_coverage/all/{key}/all_{key}_by_group.csv"
-        generate_summary_table_for_all(
-            in_path, tables_path, key, earliest_date, latest_date
-        )
-        generate_charts_for_all(in_path, charts_path, key, earliest_date, latest_date)
-        generate_report_for_all(
-            backend,
-            tables_path,
-            charts_path,
-            reports_path,
-            key,
-            earliest_date,
-            latest_date,
-        )
+    manifest = Manifest(f"{base_path}/manifest.json")
+    if force:
+        manifest.clear()
+    source_digest = compute_digest(get_source_paths(), [])
 
-        for wave in range(1, 9 + 1):
-            in_path = f"{base_path}/cumulative_coverage/group_{wave}/{key}"
+    keys = ["dose_1", "dose_2", "pf", "az"]
+    chart_tasks = []
+    chart_units = []
 
-            generate_summary_table_for_wave(
-                in_path,
-                tables_path,
-                wave,
-                key,
-                earliest_date,
-                latest_date,
-                titles,
-                label_maps,
+    # Each uptake file is loaded once, and shared between tables and charts, and each
+    # summary table that is generated is passed to the corresponding report, rather
+    # than being read back from disk.
+    cache = {}
+    summaries = {}
+
+    for key in keys:
+        in_path = f"{base_path}/cumulative_coverage/all/{key}/all_{key}_by_group.csv"
+        params = [key, earliest_date, latest_date]
+
+        unit = f"tables/all_{key}"
+        digest = get_digest(source_digest, unit, [in_path], params)
+        if not manifest.is_fresh(unit, digest):
+            summaries[unit] = generate_summary_table_for_all(
+                in_path, tables_path, key, earliest_date, latest_date, cache
             )
+            manifest.record(unit, digest, [f"{tables_path}/all_{key}.csv"])
 
-            generate_charts_for_wave(
-                in_path,
-                charts_path,
-                wave,
-                key,
-                earliest_date,
-                latest_date,
-                titles,
-                label_maps,
+        unit = f"charts/all_{key}"
+        digest = get_digest(source_digest, unit, [in_path], params + [chart_format])
+        if not manifest.is_fresh(unit, digest):
+            tasks = get_chart_tasks_for_all(
+                in_path, charts_path, key, earliest_date, latest_date, cache
             )
+            chart_tasks.extend(tasks)
+            chart_units.append((unit, digest, tasks))
 
-            generate_report_for_wave(
+        for wave in range(1, 9 + 1):
+            in_path = f"{base_path}/cumulative_coverage/group_{wave}/{key}"
+            in_paths = [f"{in_path}/group_{wave}_{key}_by_{col}.csv" for col in cols]
+            params = [wave, key, earliest_date, latest_date, titles, label_maps]
+
+            unit = f"tables/group_{wave}_{key}"
+            digest = get_digest(source_digest, unit, in_paths, params)
+            if not manifest.is_fresh(unit, digest):
+                summaries[unit] = generate_summary_table_for_wave(
+                    in_path,
+                    tables_path,
+                    wave,
+                    key,
+                    earliest_date,
+                    latest_date,
+                    titles,
+                    label_maps,
+                    cache,
+                )
+                manifest.record(unit, digest, [f"{tables_path}/group_{wave}_{key}.csv"])
+
+            unit = f"charts/group_{wave}_{key}"
+            digest = get_digest(source_digest, unit, in_paths, params + [chart_format])
+            if not manifest.is_fresh(unit, digest):
+                tasks = get_chart_tasks_for_wave(
+                    in_path,
+                    charts_path,
+                    wave,
+                    key,
+                    earliest_date,
+                    latest_date,
+                    titles,
+                    label_maps,
+                    cache,
+                )
+                chart_tasks.extend(tasks)
+                chart_units.append((unit, digest, tasks))
+
+    manifest.save()
+    cache.clear()
+    if chart_format == "json":
+        rendered_charts = write_chart_specs(chart_tasks)
+    else:
+        rendered_charts = render_charts(chart_tasks, processes, encode=not link_charts)
+
+    for unit, digest, tasks in chart_units:
+        chart_paths = [get_chart_file(args[2], chart_format) for args, _ in tasks]
+        manifest.record(unit, digest, chart_paths)
+    manifest.save()
+
+    report_params = [backend, latest_date, link_charts, chart_format]
+
+    for key in keys:
+        # Reports are generated from the tables and charts generated above
+        in_paths = [
+            f"{tables_path}/all_{key}.csv",
+            get_chart_file(f"{charts_path}/all_{key}_total.png", chart_format),
+            get_chart_file(f"{charts_path}/all_{key}_percent.png", chart_format),
+            "templates/summary.html",
+        ]
+        unit = f"reports/all_{key}"
+        digest = get_digest(source_digest, unit, in_paths, report_params + [key])
+        if not manifest.is_fresh(unit, digest):
+            generate_report_for_all(
                 backend,
                 tables_path,
                 charts_path,
                 reports_path,
-                wave,
                 key,
                 earliest_date,
                 latest_date,
+                summaries.get(f"tables/all_{key}"),
+                rendered_charts,
+                link_charts,
+                chart_format,
+            )
+            manifest.record(unit, digest, [f"{reports_path}/all_{key}.html"])
+
+        for wave in range(1, 9 + 1):
+            in_paths = (
+                [f"{tables_path}/group_{wave}_{key}.csv"]
+                + [
+                    get_chart_file(
+                        f"{charts_path}/group_{wave}_{key}_{col}.png", chart_format
+                    )
+                    for col in cols
+                ]
+                + ["templates/summary.html"]
             )
+            unit = f"reports/group_{wave}_{key}"
+            digest = get_digest(
+                source_digest, unit, in_paths, report_params + [wave, key]
+            )
+            if not manifest.is_fresh(unit, digest):
+                generate_report_for_wave(
+                    backend,
+                    tables_path,
+                    charts_path,
+                    reports_path,
+                    wave,
+                    key,
+                    earliest_date,
+                    latest_date,
+                    summaries.get(f"tables/group_{wave}_{key}"),
+                    rendered_charts,
+                    link_charts,
+                    chart_format,
+                )
+                manifest.record(
+                    unit, digest, [f"{reports_path}/group_{wave}_{key}.html"]
+                )
+
+    manifest.save()
+
+
+def get_digest(source_digest, unit, in_paths, params):
+    """Return digest of inputs to unit, including source_digest, the digest of the
+    files returned by get_source_paths().
+    """
+
+    return compute_digest(in_paths, [unit, source_digest] + params)
+
+
+def get_source_paths(templates_path="templates"):
+    """Return paths of the modules and templates that outputs are generated with."""
+
+    analysis_path = os.path.dirname(os.path.abspath(__file__))
+    module_paths = [
+        os.path.join(analysis_path, f"{module}.py") for module in source_modules
+    ]
+    template_paths = sorted(
+        os.path.join(templates_path, name) for name in os.listdir(templates_path)
+    )
+    return module_paths + template_paths
 
 
 def generate_summary_table_for_all(
-    in_path, tables_path, key, earliest_date, latest_date
+    in_path, tables_path, key, earliest_date, latest_date, cache=None
 ):
-    uptake = load_uptake(in_path, earliest_date, latest_date)
+    """Write summary table for all patients, and return it."""
+
+    uptake = load_uptake(in_path, earliest_date, latest_date, cache)
     last_week_date = uptake.index[-9]
     summary = pd.DataFrame(
         {
@@ -140,10 +306,18 @@ def generate_summary_table_for_all(
     summary.rename(index=rows, inplace=True)
 
     summary.to_csv(f"{tables_path}/all_{key}.csv", float_format="%.1f%%")
+    return summary
+
 
+def get_chart_tasks_for_all(
+    in_path, charts_path, key, earliest_date, latest_date, cache=None
+):
+    """Return list of pairs of args and kwargs for calls to plot_chart() to render the
+    charts for all patients.
+    """
 
-def generate_charts_for_all(in_path, charts_path, key, earliest_date, latest_date):
-    uptake = load_uptake(in_path, earliest_date, latest_date)
+    uptake = load_uptake(in_path, earliest_date, latest_date, cache)
+    tasks = []
 
     uptake_total = uptake.iloc[:-1] / 1_000_000
     uptake_total["total"] = uptake_total.loc[:, "0":"9"].sum(axis=1)
@@ -153,11 +327,15 @@ def generate_charts_for_all(in_path, charts_path, key, earliest_date, latest_dat
         [col for col in wave_column_headings if col in uptake_total.columns]
     ]
     uptake_total.rename(columns=wave_column_headings, inplace=True)
-    plot_chart(
-        uptake_total,
-        "Total number of patients vaccinated (million)",
-        f"{charts_path}/all_{key}_total.png",
-        is_percent=False,
+    tasks.append(
+        (
+            (
+                uptake_total,
+                "Total number of patients vaccinated (million)",
+                f"{charts_path}/all_{key}_total.png",
+            ),
+            {"is_percent": False},
+        )
     )
 
     uptake_pc = 100 * uptake / uptake.loc["total"]
@@ -169,16 +347,37 @@ def generate_charts_for_all(in_path, charts_path, key, earliest_date, latest_dat
         [col for col in wave_column_headings if col in uptake_pc.columns]
     ]
     uptake_pc.rename(columns=wave_column_headings, inplace=True)
-    plot_chart(
-        uptake_pc,
-        "Proportion of patients vaccinated",
-        f"{charts_path}/all_{key}_percent.png",
+    tasks.append(
+        (
+            (
+                uptake_pc,
+                "Proportion of patients vaccinated",
+                f"{charts_path}/all_{key}_percent.png",
+            ),
+            {},
+        )
     )
 
+    return tasks
+
 
 def generate_report_for_all(
-    backend, tables_path, charts_path, out_path, key, earliest_date, latest_date
+    backend,
+    tables_path,
+    charts_path,
+    out_path,
+    key,
+    earliest_date,
+    latest_date,
+    summary=None,
+    rendered_charts=None,
+    link_charts=False,
+    chart_format="png",
 ):
+    """Write report for all patients.  If summary is not given, the summary table is
+    read from tables_path.  See get_chart_ctx() for rendered_charts, link_charts, and
+    chart_format.
+    """
 
     subtitle = {
         "dose_1": "First dose",
@@ -187,36 +386,47 @@ def generate_report_for_all(
         "az": "AstraZeneca",
     }[key]
 
-    summary = pd.read_csv(f"{tables_path}/all_{key}.csv", index_col=0)
+    if summary is None:
+        summary = pd.read_csv(f"{tables_path}/all_{key}.csv", index_col=0)
 
-    charts = []
-    with open(f"{charts_path}/all_{key}_total.png", "rb") as f:
-        charts.append(base64.b64encode(f.read()).decode("utf8"))
-    with open(f"{charts_path}/all_{key}_percent.png", "rb") as f:
-        charts.append(base64.b64encode(f.read()).decode("utf8"))
+    chart_paths = [
+        f"{charts_path}/all_{key}_total.png",
+        f"{charts_path}/all_{key}_percent.png",
+    ]
 
     ctx = {
         "subtitle": subtitle,
         "backend": backend,
         "latest_date": latest_date,
-        "charts": charts,
+        **get_chart_ctx(
+            chart_paths, out_path, rendered_charts, link_charts, chart_format
+        ),
         "table": summary.to_html(
             classes=["table", "table-sm"], border="0", float_format="%.1f%%"
         ),
     }
 
-    with open("templates/summary.html") as f:
-        template = jinja2.Template(f.read())
-
     with open(f"{out_path}/all_{key}.html", "w") as f:
-        f.write(template.render(ctx))
+        f.write(render_template("summary.html", ctx))
 
 
 def generate_summary_table_for_wave(
-    in_path, out_path, wave, key, earliest_date, latest_date, titles, label_maps
+    in_path,
+    out_path,
+    wave,
+    key,
+    earliest_date,
+    latest_date,
+    titles,
+    label_maps,
+    cache=None,
 ):
+    """Write summary table for the given wave, and return it, or return None if there
+    is no uptake data for the wave.
+    """
+
     uptake = load_uptake(
-        f"{in_path}/group_{wave}_{key}_by_sex.csv", earliest_date, latest_date
+        f"{in_path}/group_{wave}_{key}_by_sex.csv", earliest_date, latest_date, cache
     )
     if uptake is None:
         return
@@ -232,7 +442,10 @@ def generate_summary_table_for_wave(
         title = titles[col]
         labels = label_maps[col]
         uptake = load_uptake(
-            f"{in_path}/group_{wave}_{key}_by_{col}.csv", earliest_date, latest_date
+            f"{in_path}/group_{wave}_{key}_by_{col}.csv",
+            earliest_date,
+            latest_date,
+            cache,
         )
 
         if col in demographic_cols:
@@ -270,6 +483,7 @@ def generate_summary_table_for_wave(
     summary.rename(columns=columns, inplace=True)
 
     summary.to_csv(f"{out_path}/group_{wave}_{key}.csv", float_format="%.1f%%")
+    return summary
 
 
 def compute_summary(uptake, labels=None):
@@ -290,33 +504,64 @@ def compute_summary(uptake, labels=None):
     return summary
 
 
-def generate_charts_for_wave(
-    in_path, out_path, wave, key, earliest_date, latest_date, titles, label_maps
+def get_chart_tasks_for_wave(
+    in_path,
+    out_path,
+    wave,
+    key,
+    earliest_date,
+    latest_date,
+    titles,
+    label_maps,
+    cache=None,
 ):
+    """Return list of pairs of args and kwargs for calls to plot_chart() to render the
+    charts for the given wave.
+    """
+
+    tasks = []
+
     for col in cols:
         title = f"Vaccination coverage in Priority Group {wave}\nby {titles[col]}"
         labels = label_maps[col]
         uptake = load_uptake(
-            f"{in_path}/group_{wave}_{key}_by_{col}.csv", earliest_date, latest_date
+            f"{in_path}/group_{wave}_{key}_by_{col}.csv",
+            earliest_date,
+            latest_date,
+            cache,
         )
         if uptake is None:
-            return
+            return tasks
 
         cohort_average = 100 * uptake.sum(axis=1).iloc[-2] / uptake.sum(axis=1).iloc[-1]
         uptake_pc = compute_uptake_percent(uptake, labels)
-        plot_chart(
-            uptake_pc, title, f"{out_path}/group_{wave}_{key}_{col}.png", cohort_average,
+        tasks.append(
+            (
+                (
+                    uptake_pc,
+                    title,
+                    f"{out_path}/group_{wave}_{key}_{col}.png",
+                    cohort_average,
+                ),
+                {},
+            )
         )
 
         if col == "ethnicity":
-            plot_chart(
-                uptake_pc,
-                title,
-                f"{out_path}/group_{wave}_{key}_{col}_highlighting_bangladeshi_ethnicity.png",
-                cohort_average,
-                highlight_bangladeshi_ethnicity=True,
+            tasks.append(
+                (
+                    (
+                        uptake_pc,
+                        title,
+                        f"{out_path}/group_{wave}_{key}_{col}_highlighting_bangladeshi_ethnicity.png",
+                        cohort_average,
+                    ),
+                    {"highlight_bangladeshi_ethnicity": True},
+                )
             )
 
+    return tasks
+
 
 def compute_uptake_percent(uptake, labels):
     uptake_pc = 100 * uptake / uptake.loc["total"]
@@ -335,8 +580,23 @@ def compute_uptake_percent(uptake, labels):
 
 
 def generate_report_for_wave(
-    backend, tables_path, charts_path, out_path, wave, key, earliest_date, latest_date
+    backend,
+    tables_path,
+    charts_path,
+    out_path,
+    wave,
+    key,
+    earliest_date,
+    latest_date,
+    summary=None,
+    rendered_charts=None,
+    link_charts=False,
+    chart_format="png",
 ):
+    """Write report for the given wave.  If summary is not given, the summary table is
+    read from tables_path.  See get_chart_ctx() for rendered_charts, link_charts, and
+    chart_format.
+    """
 
     subtitle = {
         "dose_1": "First dose",
@@ -347,31 +607,30 @@ def generate_report_for_wave(
 
     subtitle = f"{subtitle} / Priority Group {wave}"
 
-    try:
-        summary = pd.read_csv(f"{tables_path}/group_{wave}_{key}.csv", index_col=[0, 1])
-    except FileNotFoundError:
-        return
+    if summary is None:
+        try:
+            summary = pd.read_csv(
+                f"{tables_path}/group_{wave}_{key}.csv", index_col=[0, 1]
+            )
+        except FileNotFoundError:
+            return
 
-    charts = []
-    for col in cols:
-        with open(f"{charts_path}/group_{wave}_{key}_{col}.png", "rb") as f:
-            charts.append(base64.b64encode(f.read()).decode("utf8"))
+    chart_paths = [f"{charts_path}/group_{wave}_{key}_{col}.png" for col in cols]
 
     ctx = {
         "subtitle": subtitle,
         "backend": backend,
         "latest_date": latest_date,
-        "charts": charts,
+        **get_chart_ctx(
+            chart_paths, out_path, rendered_charts, link_charts, chart_format
+        ),
         "table": summary.to_html(
             classes=["table", "table-sm"], border="0", float_format="%.1f%%"
         ),
     }
 
-    with open("templates/summary.html") as f:
-        template = jinja2.Template(f.read())
-
     with open(f"{out_path}/group_{wave}_{key}.html", "w") as f:
-        f.write(template.render(ctx))
+        f.write(render_template("summary.html", ctx))
 
 
 def get_titles():
@@ -412,6 +671,179 @@ def get_label_maps():
     return labels
 
 
+def get_chart_ctx(chart_paths, report_path, rendered_charts, link_charts, chart_format):
+    """Return dict of variables for rendering the charts at chart_paths in a report in
+    report_path.
+
+    If chart_format is "png", charts are given as the src of img elements, which
+    inline the charts from rendered_charts or from disk, or which link to the charts
+    if link_charts is True (see chart_images.get_chart_src()).
+
+    If chart_format is "json", charts are given as the specs written by
+    write_chart_spec(), from rendered_charts or from disk.  These are always inlined.
+    """
+
+    if chart_format == "json":
+        return {
+            "chart_specs": [
+                load_chart_spec(chart_path, rendered_charts)
+                for chart_path in chart_paths
+            ]
+        }
+
+    return {
+        "charts": [
+            get_chart_src(chart_path, report_path, rendered_charts, link_charts)
+            for chart_path in chart_paths
+        ]
+    }
+
+
+def get_chart_file(chart_path, chart_format):
+    """Return path of file that chart at chart_path is written to in chart_format.
+    Charts are identified by the path of their PNG file.
+    """
+
+    return os.path.splitext(chart_path)[0] + f".{chart_format}"
+
+
+def render_charts(tasks, processes=None, encode=True):
+    """Render charts, given as a list of pairs of args and kwargs for calls to
+    plot_chart(), in a pool of processes.
+
+    If encode is True, return dict mapping the path of each chart to the chart,
+    base64-encoded.  Otherwise, return an empty dict.
+
+    Each worker process renders with the Agg backend.  If processes is 1, charts are
+    rendered in this process.
+    """
+
+    tasks = [(task, encode) for task in tasks]
+
+    if processes == 1:
+        results = map(render_chart, tasks)
+        return {path: encoded for path, encoded in results if encoded is not None}
+
+    with multiprocessing.Pool(
+        processes, initializer=mpl.use, initargs=("Agg",)
+    ) as pool:
+        results = pool.imap_unordered(render_chart, tasks)
+        return {path: encoded for path, encoded in results if encoded is not None}
+
+
+def render_chart(task_and_encode):
+    (args, kwargs), encode = task_and_encode
+    encoded = plot_chart(*args, **kwargs)
+    return args[2], encoded if encode else None
+
+
+def write_chart_specs(tasks):
+    """Write chart specs for charts, given as a list of pairs of args and kwargs for
+    calls to plot_chart(), and return dict mapping the path of each chart to its
+    spec.
+    """
+
+    return {args[2]: write_chart_spec(*args, **kwargs) for args, kwargs in tasks}
+
+
+def write_chart_spec(
+    df,
+    title,
+    out_path,
+    cohort_average=None,
+    is_percent=True,
+    highlight_bangladeshi_ethnicity=False,
+):
+    """Write JSON document describing the chart that plot_chart() would plot with the
+    same arguments, and return it.
+
+    The document contains the series, labels, title, and cohort average line of the
+    chart, and is rendered client-side by templates/summary.html.
+    """
+
+    dates = pd.to_datetime(df.index)
+    colours = mpl.rcParams["axes.prop_cycle"].by_key()["color"]
+    series = []
+    seen_labels = set()
+
+    for ix, col in enumerate(df.columns):
+        if highlight_bangladeshi_ethnicity:
+            c, alpha, thickness, label = get_highlight_style(col)
+        else:
+            c, alpha, thickness = colours[ix % len(colours)], 1, None
+            label = col
+
+        series.append(
+            {
+                "label": label,
+                "colour": to_css_colour(c, alpha),
+                "width": thickness or mpl.rcParams["lines.linewidth"],
+                "in_legend": label not in seen_labels,
+                "values": [
+                    None if pd.isnull(value) else round(float(value), 4)
+                    for value in df[col]
+                ],
+            }
+        )
+        seen_labels.add(label)
+
+    week_days = dates[dates.dayofweek == TU.weekday]
+    tick_labels = dict(zip(week_days.strftime("%Y-%m-%d"), get_tick_labels(week_days)))
+
+    spec = {
+        "title": title,
+        "dates": list(dates.strftime("%Y-%m-%d")),
+        "tick_labels": tick_labels,
+        "series": series,
+        "is_percent": is_percent,
+        "cohort_average": None if cohort_average is None else float(cohort_average),
+    }
+
+    with open(get_chart_file(out_path, "json"), "w") as f:
+        json.dump(spec, f, separators=(",", ":"))
+
+    return spec
+
+
+def load_chart_spec(chart_path, chart_specs=None):
+    """Return spec of chart at chart_path, from chart_specs (a dict mapping paths to
+    specs) if it is there, and otherwise read from disk.
+    """
+
+    spec = (chart_specs or {}).get(chart_path)
+    if spec is None:
+        with open(get_chart_file(chart_path, "json")) as f:
+            spec = json.load(f)
+    return spec
+
+
+def to_css_colour(c, alpha):
+    r, g, b, a = mpl.colors.to_rgba(c, alpha)
+    return f"rgba({round(r * 255)}, {round(g * 255)}, {round(b * 255)}, {a})"
+
+
+def get_highlight_style(col):
+    """Return colour, alpha, line thickness, and legend label of series for col in a
+    chart highlighting Bangladeshi ethnicity.
+    """
+
+    if "Bangladeshi" in col:
+        return "r", 1, 3, "Asian or Asian British - Bangladeshi"
+    elif "Asian or Asian British" in col:
+        return "r", 0.6, 1, "Asian or Asian British"
+    else:
+        return "b", 0.3, 1, "Other ethnicities"
+
+
+def get_tick_labels(week_days):
+    return [
+        d.strftime("%d %b %Y")
+        if ix == 0 or d.month == 1 and d.day <= 7
+        else d.strftime("%d %b")
+        for ix, d in enumerate(week_days)
+    ]
+
+
 def plot_chart(
     df,
     title,
@@ -420,20 +852,14 @@ def plot_chart(
     is_percent=True,
     highlight_bangladeshi_ethnicity=False,
 ):
+    """Plot chart of df, save it to out_path, and return it, base64-encoded."""
+
     df.index = pd.to_datetime(df.index)
     ax = plt.gca()
 
     if highlight_bangladeshi_ethnicity:
         for col in df.columns:
-            if "Bangladeshi" in col:
-                c, alpha, thickness = "r", 1, 3
-                label = "Asian or Asian British - Bangladeshi"
-            elif "Asian or Asian British" in col:
-                c, alpha, thickness = "r", 0.6, 1
-                label = "Asian or Asian British"
-            else:
-                c, alpha, thickness = "b", 0.3, 1
-                label = "Other ethnicities"
+            c, alpha, thickness, label = get_highlight_style(col)
             ax.plot(df[col], alpha=alpha, c=c, label=label, linewidth=thickness)
 
         handles, labels = ax.get_legend_handles_labels()
@@ -454,12 +880,7 @@ def plot_chart(
     # Add x-axis ticks for each Tuesday (the day that vaccines were first made
     # available.)
     week_days = df.loc[df.index.dayofweek == TU.weekday]
-    tick_labels = [
-        d.strftime("%d %b %Y")
-        if ix == 0 or d.month == 1 and d.day <= 7
-        else d.strftime("%d %b")
-        for ix, d in enumerate(week_days.index)
-    ]
+    tick_labels = get_tick_labels(week_days.index)
     ax.xaxis.set_major_locator(WeekdayLocator(byweekday=TU, interval=1))
     ax.xaxis.set_major_formatter(FixedFormatter(tick_labels))
     ax.xaxis.set_tick_params(rotation=90)
@@ -474,11 +895,26 @@ def plot_chart(
         ax.axhline(cohort_average, color="k", linestyle="--", alpha=0.5)
         ax.text(df.index[0], cohort_average * 1.02, "latest overall cohort rate")
 
-    plt.savefig(out_path, dpi=300, bbox_inches="tight")
+    encoded = save_chart(out_path, dpi=300, bbox_inches="tight")
     plt.close()
+    return encoded
+
+
+def load_uptake(path, earliest_date, latest_date, cache=None):
+    """Return uptake DataFrame loaded from path, restricted to dates between
+    earliest_date and latest_date, or None if path does not exist.
 
+    If cache (a dict) is given, the DataFrame is stored in it, and is returned by any
+    later call with the same arguments.  Cached DataFrames are shared between callers,
+    so must not be modified.
+    """
+
+    if cache is not None:
+        cache_key = (path, earliest_date, latest_date)
+        if cache_key not in cache:
+            cache[cache_key] = load_uptake(path, earliest_date, latest_date)
+        return cache[cache_key]
 
-def load_uptake(path, earliest_date, latest_date):
     try:
         uptake = pd.read_csv(path, index_col=0)
     except FileNotFoundError:
@@ -491,6 +927,28 @@ def load_uptake(path, earliest_date, latest_date):
 
 
 if __name__ == "__main__":
-    import sys
-
-    run(*sys.argv[1:])
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base_path")
+    parser.add_argument("earliest_date")
+    parser.add_argument("latest_date")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate all outputs, ignoring the manifest of previous outputs",
+    )
+    parser.add_argument("--link-charts", action="store_true")
+    parser.add_argument("--chart-format", choices=["png", "json"], default="png")
+    args = parser.parse_args()
+
+    run(
+        args.base_path,
+        args.earliest_date,
+        args.latest_date,
+        processes=args.processes,
+        force=args.force,
+        link_charts=args.link_charts,
+        chart_format=args.chart_format,
+    )
@@ -0,0 +1,139 @@
+"""Compact representation of the boolean group columns of the cohort.
+
+Each of the group columns in the transformed cohort takes a byte per patient.  Packing
+them into a single uint32 per patient, with a bit for each group, takes a fraction of
+the space, and lets us find patients in any combination of groups by comparing a
+single array with a bit mask.
+
+Bit ix of a patient's flags is set if the patient is in flag_cols[ix].  The packed
+flags are stored in a column called FLAGS_COL, which replaces the group columns.
+"""
+
+import numpy as np
+
+from groups import at_risk_groups, groups
+
+
+FLAGS_COL = "group_flags"
+DTYPE = np.dtype("<u4")
+
+# The group columns of the transformed cohort
+group_cols = [
+    group for group in groups if "covax" not in group and "unstatvacc" not in group
+]
+extra_at_risk_cols = [group for group in at_risk_groups if group not in group_cols]
+flag_cols = group_cols + extra_at_risk_cols
+
+assert len(flag_cols) <= DTYPE.itemsize * 8
+
+bits = {col: np.uint32(1 << ix) for ix, col in enumerate(flag_cols)}
+
+# (256, 8) array whose [value, ix] entry is 1 if bit ix of byte value is set
+byte_bits = np.unpackbits(
+    np.arange(256, dtype="u1").reshape(-1, 1), axis=1, bitorder="little"
+).astype("int64")
+
+
+def pack(df, cols=None):
+    """Return array of flags of the given group columns (by default, those of flag_cols
+    that are in df) of df.  Bits of other groups are not set.
+    """
+
+    if cols is None:
+        cols = [col for col in flag_cols if col in df.columns]
+
+    flags = np.zeros(len(df), dtype=DTYPE)
+    for col in cols:
+        flags |= df[col].values.astype(bool, copy=False) * bits[col]
+    return flags
+
+
+def unpack(flags, cols=None):
+    """Return dict mapping each of cols (by default, all of flag_cols) to a boolean
+    array indicating which patients are in that group.
+    """
+
+    if cols is None:
+        cols = flag_cols
+    return {col: (flags & bits[col]) != 0 for col in cols}
+
+
+def get_bit_mask(cols):
+    bit_mask = np.uint32(0)
+    for col in cols:
+        bit_mask |= bits[col]
+    return bit_mask
+
+
+def in_all_groups(flags, cols):
+    """Return boolean array indicating which patients are in all of the given groups."""
+
+    bit_mask = get_bit_mask(cols)
+    return (flags & bit_mask) == bit_mask
+
+
+def in_any_group(flags, cols):
+    """Return boolean array indicating which patients are in any of the given groups."""
+
+    return (flags & get_bit_mask(cols)) != 0
+
+
+def count_each_group(flags):
+    """Return dict mapping each of flag_cols to the number of patients in that group."""
+
+    counts = count_each_group_by(flags, np.zeros(len(flags), dtype="int64"), 1)
+    return {col: int(counts[0, ix]) for ix, col in enumerate(flag_cols)}
+
+
+def count_each_group_by(flags, codes, num_codes):
+    """Return (num_codes, len(flag_cols)) array of counts of patients in each group,
+    by code.  codes must be between 0 and num_codes - 1.
+
+    Rather than testing each bit of each patient's flags, each byte of the flags is
+    counted by code with np.bincount, and the counts of each byte value are then
+    summed for each of the bits that the value has set.
+    """
+
+    flag_bytes = flags.astype(DTYPE, copy=False).view("u1").reshape(-1, DTYPE.itemsize)
+    codes = codes.astype("int64") * 256
+
+    counts = []
+    for ix in range(DTYPE.itemsize):
+        byte_counts = np.bincount(
+            codes + flag_bytes[:, ix], minlength=num_codes * 256
+        ).reshape(num_codes, 256)
+        counts.append(byte_counts @ byte_bits)
+
+    return np.hstack(counts)[:, : len(flag_cols)]
+
+
+def in_groups(cohort, cols):
+    """Return boolean array indicating which patients in cohort are in all of the given
+    groups, whether cohort holds group columns or packed flags.
+    """
+
+    if FLAGS_COL in cohort.columns:
+        return in_all_groups(cohort[FLAGS_COL].values, cols)
+
+    mask = np.ones(len(cohort), dtype=bool)
+    for col in cols:
+        mask &= cohort[col].values
+    return mask
+
+
+def pack_groups(df):
+    """Replace group columns of df with a column of packed flags, in place."""
+
+    cols = [col for col in flag_cols if col in df.columns]
+    df[FLAGS_COL] = pack(df, cols)
+    df.drop(columns=cols, inplace=True)
+
+
+def unpack_groups(df, cols=None):
+    """Replace column of packed flags of df with the given group columns (by default,
+    all of flag_cols), in place.
+    """
+
+    for col, values in unpack(df[FLAGS_COL].values, cols).items():
+        df[col] = values
+    df.drop(columns=[FLAGS_COL], inplace=True)
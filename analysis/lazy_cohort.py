@@ -0,0 +1,99 @@
+"""A cohort whose derived columns are computed only when they are needed.
+
+transform_fast.transform() adds several dozen columns to the cohort, but only some of
+them are kept, and a stage that only needs, say, wave and vacc1_dat does not need the
+others to be computed at all.
+
+A LazyCohort wraps a DataFrame of base columns, and a list of derivations.  Each
+derivation is a function, such as transform_fast.add_waves(), that adds some columns
+to a cohort, and that reads the columns that it depends on from the same cohort.  When
+a derived column is requested, its derivation is run against the LazyCohort, so that
+the columns that the derivation reads are themselves computed on demand.  The
+dependency graph between derivations is therefore followed as it is needed, without
+having to be declared up front.
+
+Placeholder columns, where every value is missing, are never stored.  A new all-null
+Series is returned each time one is requested, and is freed once the derivation that
+requested it is finished with it.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class LazyCohort:
+    def __init__(self, df, derivations, placeholder_cols=()):
+        """Wrap df, which holds the base columns of the cohort.
+
+        derivations is a list of (func, cols) pairs, where func(cohort) adds cols to
+        cohort.  placeholder_cols are columns where every value is missing.
+        """
+
+        self._df = df
+        self._derived = {}
+        self._derivations = {}
+        self._running = set()
+        self._placeholder_cols = list(placeholder_cols)
+
+        for func, cols in derivations:
+            for col in cols:
+                assert col not in self._derivations, col
+                self._derivations[col] = func
+
+    def __len__(self):
+        return len(self._df)
+
+    @property
+    def index(self):
+        return self._df.index
+
+    @property
+    def columns(self):
+        return pd.Index(
+            list(self._df.columns)
+            + [col for col in self._derivations if col not in self._df.columns]
+            + self._placeholder_cols
+        )
+
+    @property
+    def derived_cols(self):
+        """Return list of derived columns that have been computed so far."""
+
+        return list(self._derived)
+
+    def __getitem__(self, col):
+        if col in self._derived:
+            return self._derived[col]
+
+        if col in self._df.columns:
+            return self._df[col]
+
+        if col in self._placeholder_cols:
+            return pd.Series(np.nan, index=self.index, name=col)
+
+        if col not in self._derivations:
+            raise KeyError(col)
+
+        func = self._derivations[col]
+        if func in self._running:
+            raise ValueError(f"{func.__name__}() reads {col} before it adds it")
+
+        self._running.add(func)
+        try:
+            func(self)
+        finally:
+            self._running.remove(func)
+
+        return self._derived[col]
+
+    def __setitem__(self, col, value):
+        if not isinstance(value, pd.Series):
+            value = pd.Series(value, index=self.index, name=col)
+        self._derived[col] = value
+
+    def project(self, cols):
+        """Return DataFrame of the given columns, computing only those derived columns
+        that they depend on.
+        """
+
+        return pd.DataFrame({col: self[col] for col in cols}, index=self.index)
@@ -0,0 +1,65 @@
+"""Manifest recording what each output of a run was generated from.
+
+Each entry is keyed by the name of a unit of output (such as a table, or the charts
+for a wave), and records a digest of the input files and parameters that the unit was
+generated from, and the paths of the files that were written.  A unit needs to be
+regenerated if its digest has changed, or if any of its files is missing.
+"""
+
+import hashlib
+import json
+import os
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def is_fresh(self, unit, digest):
+        entry = self.entries.get(unit)
+        return (
+            entry is not None
+            and entry["digest"] == digest
+            and all(os.path.exists(path) for path in entry["paths"])
+        )
+
+    def record(self, unit, digest, paths):
+        """Record that unit was generated from inputs with given digest, and that
+        those of paths that exist were written.
+        """
+
+        self.entries[unit] = {
+            "digest": digest,
+            "paths": [str(path) for path in paths if os.path.exists(path)],
+        }
+
+    def clear(self):
+        self.entries = {}
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+def compute_digest(input_paths, params):
+    """Return digest of contents of input_paths and of params, which must be
+    JSON-serialisable.  Missing input files contribute to the digest too.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True).encode("utf8"))
+
+    for path in input_paths:
+        digest.update(str(path).encode("utf8"))
+        try:
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except FileNotFoundError:
+            digest.update(b"missing")
+
+    return digest.hexdigest()
@@ -1,17 +1,16 @@
-import base64
-import csv
 import os
 from datetime import datetime, timedelta
 
-import jinja2
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from age_bands import age_bands
+from chart_images import get_chart_src, save_chart
+from codelist_mappings import get_high_level_ethnicity_labels
 from groups import groups
+from templating import render_template
 
 
-def run():
+def run(link_charts=False):
     backend = os.getenv("OPENSAFELY_BACKEND", "expectations")
 
     demographic_cols = ["sex", "age_band", "high_level_ethnicity"]
@@ -22,7 +21,9 @@ def run():
     titles = get_titles(groups)
     label_maps = get_label_maps(group_cols)
 
-    charts = make_charts(backend, demographic_cols + group_cols, titles, label_maps)
+    charts = make_charts(
+        backend, demographic_cols + group_cols, titles, label_maps, link_charts
+    )
     summary = make_summary(backend, demographic_cols, group_cols, titles, label_maps)
 
     ctx = {
@@ -30,11 +31,8 @@ def run():
         "summary": summary.to_html(classes=["table", "table-sm"], float_format="%.1f%%"),
     }
 
-    with open("templates/report.html.template") as f:
-        template = jinja2.Template(f.read())
-
     with open(f"output/report_{backend}.html", "w") as f:
-        f.write(template.render(ctx))
+        f.write(render_template("report.html.template", ctx))
 
 
 def get_titles(groups):
@@ -56,16 +54,10 @@ def get_label_maps(group_cols):
         if band in range(1, 12 + 1)
     }
 
-    high_level_ethnicity_labels = {}
-    with open("codelists/primis-covid19-vacc-uptake-eth2001.csv") as f:
-        for record in csv.DictReader(f):
-            category = record["grouping_6_id"]
-            label = record["grouping_6_label"]
-            if category in high_level_ethnicity_labels:
-                assert high_level_ethnicity_labels[category] == label
-            else:
-                high_level_ethnicity_labels[category] = label
-    high_level_ethnicity_labels["6"] = "Unknown"
+    high_level_ethnicity_labels = {
+        str(category): label
+        for category, label in get_high_level_ethnicity_labels().items()
+    }
 
     labels = {
         "age_band": age_band_labels,
@@ -79,7 +71,11 @@ def get_label_maps(group_cols):
     return labels
 
 
-def make_charts(backend, cols, titles, label_maps):
+def make_charts(backend, cols, titles, label_maps, link_charts=False):
+    """Save a chart for each of cols, and return list of dicts with the title of each
+    chart, and the src of an img element for the chart in a report in output/.
+    """
+
     charts = []
 
     for col in cols:
@@ -90,12 +86,11 @@ def make_charts(backend, cols, titles, label_maps):
 
         uptake_pc = compute_uptake_percent(uptake, labels)
         uptake_pc.plot()
-        plt.savefig(f"output/{base_filename}.png")
+        chart_path = f"output/{base_filename}.png"
+        encoded = save_chart(chart_path)
+        src = get_chart_src(chart_path, "output", {chart_path: encoded}, link_charts)
 
-        with open(f"output/{base_filename}.png", "rb") as f:
-            png_data = base64.b64encode(f.read()).decode("utf8")
-
-        charts.append({"title": titles[col], "png_data": png_data})
+        charts.append({"title": titles[col], "src": src})
 
     return charts
 
@@ -188,4 +183,10 @@ def compute_summary(uptake, labels):
 
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--link-charts", action="store_true")
+    args = parser.parse_args()
+
+    run(link_charts=args.link_charts)
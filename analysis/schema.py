@@ -0,0 +1,66 @@
+import pandas as pd
+
+
+# Mapping from column of the raw cohort to the dtype it is loaded with.
+raw_cohort_dtypes = {
+    "patient_id": "int64",
+    "age": "int16",
+    "sex": pd.CategoricalDtype(["F", "M", "U", "I"]),
+    "imd": "float32",
+    "stp": "category",
+    "bmi_val": "float64",
+    "eth2001": "float32",
+}
+
+# Columns of the raw cohort that are parsed as dates.
+raw_cohort_date_cols = [
+    "ast_dat",
+    "astadm_dat",
+    "astrxm1_dat",
+    "astrxm2_dat",
+    "astrxm3_dat",
+    "resp_cov_dat",
+    "chd_cov_dat",
+    "ckd_cov_dat",
+    "ckd15_dat",
+    "ckd35_dat",
+    "cld_dat",
+    "diab_dat",
+    "immdx_cov_dat",
+    "immrx_dat",
+    "cns_cov_dat",
+    "spln_cov_dat",
+    "bmi_dat",
+    "bmi_stage_dat",
+    "sev_obesity_dat",
+    "dmres_dat",
+    "sev_mental_dat",
+    "smhres_dat",
+    "shield_dat",
+    "nonshield_dat",
+    "hhld_imdef_dat",
+    "learndis_dat",
+    "covadm1_dat",
+    "covadm2_dat",
+    "pfd1rx_dat",
+    "pfd2rx_dat",
+    "azd1rx_dat",
+    "azd2rx_dat",
+    "covrx1_dat",
+    "covrx2_dat",
+    "carer_dat",
+    "notcarer_dat",
+    "carehome_dat",
+    "nursehome_dat",
+    "domcare_dat",
+    "longres_dat",
+    "non_eth2001_dat",
+    "eth_notgiptref_dat",
+    "eth_notstated_dat",
+    "eth_norecord_dat",
+    "pregdel_dat",
+    "preg_dat",
+    "covcontra_dat",
+    "cov1decl_dat",
+    "cov2decl_dat",
+]
@@ -0,0 +1,24 @@
+"""Shared Jinja2 environment for rendering reports.
+
+Each template is loaded from templates/ and compiled at most once per process.
+Compiled templates are also cached on disk, so that later processes can skip
+compilation.
+"""
+
+import functools
+
+import jinja2
+
+
+@functools.lru_cache(maxsize=None)
+def get_environment(templates_path="templates"):
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(templates_path),
+        bytecode_cache=jinja2.FileSystemBytecodeCache(),
+        # Templates do not change while reports are being generated
+        auto_reload=False,
+    )
+
+
+def render_template(name, ctx, templates_path="templates"):
+    return get_environment(templates_path).get_template(name).render(ctx)
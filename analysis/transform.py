@@ -1,15 +1,22 @@
 import os
 
-import transform_fast, transform_slow
+import transform_fast
 
 
-def run(input_path="output/input.csv", output_path="output/cohort.pickle"):
+# The EMIS cohort is too large to be loaded into memory in one go, so we stream it
+# through the vectorised transform this many rows at a time.
+EMIS_CHUNK_SIZE = 1_000_000
+
+
+def run(input_path="output/input.csv", output_path="output/cohort.parquet"):
     backend = os.getenv("OPENSAFELY_BACKEND", "expectations")
 
     if backend == "emis":
-        transform_slow.run(input_path, output_path)
+        chunk_size = EMIS_CHUNK_SIZE
     else:
-        transform_fast.run(input_path, output_path)
+        chunk_size = None
+
+    transform_fast.run(input_path, output_path, chunk_size=chunk_size)
 
 
 if __name__ == "__main__":
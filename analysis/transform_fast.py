@@ -1,20 +1,21 @@
-import csv
-
 import numpy as np
 import pandas as pd
 
-from age_bands import add_age_bands
-from add_groupings import add_groupings
-from groups import at_risk_groups, groups
+from add_groupings_numpy import add_groupings_numpy
+from bandings import assign_age_bands, assign_imd_bands, assign_waves
+from codelist_mappings import get_high_level_ethnicity_lookup
+from cohort_store import write_cohort, write_cohort_in_chunks
+from day_offsets import encode_dates, isnull, notnull
+from group_flags import extra_at_risk_cols, group_cols, pack_groups
+from groups import groups
+from lazy_cohort import LazyCohort
+from schema import raw_cohort_date_cols, raw_cohort_dtypes
 
 
 demographic_cols = ["age_band", "sex", "ethnicity", "high_level_ethnicity", "imd_band"]
 
-group_cols = [
-    group for group in groups if "covax" not in group and "unstatvacc" not in group
-]
-
-extra_at_risk_cols = [group for group in at_risk_groups if group not in group_cols]
+# The categories of the sex column of the transformed cohort
+sex_categories = ["F", "M"]
 
 extra_cols = ["patient_id", "vacc1_dat", "vacc2_dat", "wave"]
 
@@ -32,48 +33,142 @@ necessary_cols = (
     demographic_cols + group_cols + extra_at_risk_cols + extra_cols + vacc_cols
 )
 
+# Columns of the raw cohort that are not used by transform(), and so are not loaded.
+unused_raw_cols = [
+    "stp",
+    "bmi_stage_dat",
+    "hhld_imdef_dat",
+    "carer_dat",
+    "notcarer_dat",
+    "carehome_dat",
+    "nursehome_dat",
+    "domcare_dat",
+    "eth_norecord_dat",
+    "covcontra_dat",
+    "cov1decl_dat",
+    "cov2decl_dat",
+]
+
+raw_cols = [
+    col
+    for col in list(raw_cohort_dtypes) + raw_cohort_date_cols
+    if col not in unused_raw_cols
+]
+
+
+def run(
+    input_path="output/input.csv",
+    output_path="output/cohort.parquet",
+    chunk_size=None,
+    compact_dates=False,
+    packed_groups=False,
+):
+    """Transform the cohort, optionally streaming the input in chunks.
+
+    When chunk_size is given, at most chunk_size rows of the raw cohort are held in
+    memory at once, and the necessary columns of each transformed chunk are appended
+    to the output.
+
+    When compact_dates is True, dates in the transformed cohort are encoded as int16
+    day offsets (see day_offsets.py).
+
+    When packed_groups is True, the group columns of the transformed cohort are packed
+    into a single column of flags (see group_flags.py).
+
+    Only the derived columns that the necessary columns depend on are computed.
+    """
+
+    if chunk_size is None:
+        raw_cohort = load_raw_cohort(input_path)
+        cohort = transform_for_store(raw_cohort, compact_dates, packed_groups)
+        write_cohort(cohort, output_path)
+    else:
+        chunks = (
+            transform_for_store(raw_chunk, compact_dates, packed_groups)
+            for raw_chunk in load_raw_cohort_in_chunks(input_path, chunk_size)
+        )
+        write_cohort_in_chunks(chunks, output_path)
+
+
+def transform_for_store(raw_cohort, compact_dates, packed_groups):
+    """Return the necessary columns of the transformed cohort, to be written out."""
 
-def run(input_path="output/input.csv", output_path="output/cohort.pickle"):
-    raw_cohort = load_raw_cohort(input_path)
-    cohort = transform(raw_cohort)
-    cohort[necessary_cols].to_pickle(output_path)
+    cohort = transform_lazy(raw_cohort, compact_dates).project(necessary_cols)
+    if packed_groups:
+        pack_groups(cohort)
+    return cohort
 
 
 def load_raw_cohort(input_path):
-    with open(input_path) as f:
-        reader = csv.reader(f)
-        fieldnames = next(reader)
+    return pd.read_csv(input_path, **get_read_csv_kwargs())
 
-    date_fieldnames = [fn for fn in fieldnames if fn.endswith("_dat")]
-    raw_cohort = pd.read_csv(input_path, parse_dates=date_fieldnames)
-    return raw_cohort
 
+def load_raw_cohort_in_chunks(input_path, chunk_size):
+    """Yield the raw cohort as DataFrames of at most chunk_size rows.
 
-def transform(cohort):
-    """Transform data generated by study definition."""
+    The index of each chunk continues on from the previous chunk, so that the
+    concatenated chunks have the same index as the result of load_raw_cohort().
+    """
 
-    drop_non_fm_sex(cohort)
-    drop_over_120_age(cohort)
-    add_imd_bands(cohort)
-    add_ethnicity(cohort)
-    add_high_level_ethnicity(cohort)
+    with pd.read_csv(
+        input_path, chunksize=chunk_size, **get_read_csv_kwargs()
+    ) as reader:
+        yield from reader
+
+
+def get_read_csv_kwargs():
+    """Return kwargs for pd.read_csv() to load only the columns of the raw cohort that
+    are used by transform(), with the dtypes given by the study definition.
+    """
+
+    return {
+        "usecols": raw_cols,
+        "dtype": {
+            col: dtype for col, dtype in raw_cohort_dtypes.items() if col in raw_cols
+        },
+        "parse_dates": [col for col in raw_cohort_date_cols if col in raw_cols],
+    }
+
+
+def transform(cohort, compact_dates=False):
+    """Transform data generated by study definition.
+
+    When compact_dates is True, date columns are encoded as int16 day offsets before
+    being transformed.
+    """
+
+    drop_rows(cohort, compact_dates)
     add_missing_vacc_columns(cohort)
-    add_vacc_dates(cohort)
-    # The PRIMIS spec contains a number of overlapping age bands.  Bands 1 to 12 are
-    # non-overlapping and we use these by default.  We can add other age bands as
-    # required.
-    add_age_bands(cohort, range(1, 12 + 1))
-    add_groupings(cohort)
-    add_waves(cohort)
-    add_extra_at_risk_cols(cohort)
+    for derive, _ in derivations:
+        derive(cohort)
     return cohort
 
 
+def transform_lazy(cohort, compact_dates=False):
+    """Transform data generated by study definition, returning a LazyCohort whose
+    derived columns are only computed when they are requested.
+
+    Rows are dropped, and dates encoded, straight away.  The placeholder columns added
+    by add_missing_vacc_columns() are never stored.
+    """
+
+    drop_rows(cohort, compact_dates)
+    return LazyCohort(cohort, derivations, placeholder_cols=extra_vacc_cols)
+
+
+def drop_rows(cohort, compact_dates):
+    drop_non_fm_sex(cohort)
+    drop_over_120_age(cohort)
+    if compact_dates:
+        encode_dates(cohort)
+
+
 def drop_non_fm_sex(cohort):
     """Drop records where sex is not F or M."""
 
     ix = cohort[~cohort["sex"].isin(["F", "M"])].index
     cohort.drop(ix, inplace=True)
+    cohort["sex"] = cohort["sex"].astype(pd.CategoricalDtype(sex_categories))
 
 
 def drop_over_120_age(cohort):
@@ -86,19 +181,19 @@ def drop_over_120_age(cohort):
     cohort.drop(ix, inplace=True)
 
 
+def add_default_age_bands(cohort):
+    # The PRIMIS spec contains a number of overlapping age bands.  Bands 1 to 12 are
+    # non-overlapping and we use these by default.  We can add other age bands as
+    # required.
+    age_band = assign_age_bands(cohort["age"].values, range(1, 12 + 1))
+    assert age_band.all()
+    cohort["age_band"] = age_band
+
+
 def add_imd_bands(cohort):
     """Add IMD band from 1 (most deprived) to 5 (least deprived), or 0 if missing."""
 
-    cohort["imd_band"] = 0
-    s = cohort["imd_band"]
-
-    for band in range(1, 5 + 1):
-        s.mask(
-            ((band - 1) < cohort["imd"] * 5 / 32844)
-            & (cohort["imd"] * 5 / 32844 < band),
-            band,
-            inplace=True,
-        )
+    cohort["imd_band"] = assign_imd_bands(cohort["imd"].values)
 
 
 def add_ethnicity(cohort):
@@ -108,13 +203,13 @@ def add_ethnicity(cohort):
     s = cohort["eth2001"].copy()
 
     # Add band 17 (Patients with any other ethnicity code)
-    s.mask(s.isna() & cohort["non_eth2001_dat"].notna(), 17, inplace=True)
+    s.mask(s.isna() & notnull(cohort["non_eth2001_dat"]), 17, inplace=True)
 
     # Add band 18 (Ethnicity not given - patient refused)
-    s.mask(s.isna() & cohort["eth_notgiptref_dat"].notna(), 18, inplace=True)
+    s.mask(s.isna() & notnull(cohort["eth_notgiptref_dat"]), 18, inplace=True)
 
     # Add band 19 (Ethnicity not stated)
-    s.mask(s.isna() & cohort["eth_notstated_dat"].notna(), 19, inplace=True)
+    s.mask(s.isna() & notnull(cohort["eth_notstated_dat"]), 19, inplace=True)
 
     # Add band 20 (Ethnicity not recorded)
     s.mask(s.isna(), 20, inplace=True)
@@ -125,29 +220,9 @@ def add_ethnicity(cohort):
 def add_high_level_ethnicity(cohort):
     """Add high-level ethnicity categories, based on bandings from PRIMIS spec."""
 
-    # Get mapping from category (1-16) to high-level category (1-5)
-    category_to_high_level_category = {}
-    with open("codelists/primis-covid19-vacc-uptake-eth2001.csv") as f:
-        for record in csv.DictReader(f):
-            category = int(record["grouping_16_id"])
-            high_level_category = int(record["grouping_6_id"])
-
-            if category in category_to_high_level_category:
-                assert category_to_high_level_category[category] == high_level_category
-            else:
-                category_to_high_level_category[category] = high_level_category
-
-    # Set high_level_ethnicity based on ethnicity column
-    cohort["high_level_ethnicity"] = np.nan
-    s = cohort["high_level_ethnicity"]
-
-    for category, high_level_category in category_to_high_level_category.items():
-        s.mask(cohort["ethnicity"] == category, high_level_category, inplace=True)
-
-    # For all other patients, set high_level_ethnicity to 6 (unknown)
-    s.mask(s.isna(), 6, inplace=True)
-
-    cohort["high_level_ethnicity"] = s.astype("int8")
+    # Map category (1-20) to high-level category (1-6)
+    lookup = get_high_level_ethnicity_lookup()
+    cohort["high_level_ethnicity"] = lookup[cohort["ethnicity"].values]
 
 
 def add_missing_vacc_columns(cohort):
@@ -166,48 +241,25 @@ def add_vacc_dates(cohort):
     In some cases, a patient will have only one covadm1/2_dat and covrx1/2_dat.
     """
 
-    cohort["vacc1_dat"] = cohort[["covadm1_dat", "covrx1_dat"]].min(axis=1)
-    cohort["vacc2_dat"] = cohort[["covadm2_dat", "covrx2_dat"]].min(axis=1)
+    for ix in 1, 2:
+        covadm_dat = cohort[f"covadm{ix}_dat"]
+        covrx_dat = cohort[f"covrx{ix}_dat"]
+        cohort[f"vacc{ix}_dat"] = covadm_dat.where(
+            notnull(covadm_dat) & (isnull(covrx_dat) | (covadm_dat <= covrx_dat)),
+            covrx_dat,
+        )
 
 
 def add_waves(cohort):
-    cohort["wave"] = 0
-    s = cohort["wave"]
-
-    # Wave 1: Residents in Care Homes
-    # (The spec includes staff in care homes, but occupation codes are not well
-    # recorded)
-    s.mask(cohort["longres_dat"].notnull(), 1, inplace=True)
-
-    # Wave 2: Age 80 or over
-    # (This spec includes frontline H&SC workers, but see above.)
-    s.mask((s == 0) & (cohort["age"] >= 80), 2, inplace=True)
-
-    # Wave 3: Age 75 - 79
-    s.mask((s == 0) & (cohort["age"] >= 75), 3, inplace=True)
-
-    # Wave 4: Clinically Extremely Vulnerable or age 70 - 74
-    s.mask(
-        (s == 0) & (cohort["shield_group"] | (cohort["age"] >= 70)), 4, inplace=True
-    )
-
-    # Wave 5: Age 65 - 69
-    s.mask((s == 0) & (cohort["age"] >= 65), 5, inplace=True)
+    """Add wave, from 1 to 9, or 0 if a patient is in no wave.  See bandings.py."""
 
-    # Wave 6: Age 16-64 in a defined At Risk group
-    s.mask(
-        (s == 0) & ((cohort["age"] >= 16) & cohort["atrisk_group"]), 6, inplace=True
+    cohort["wave"] = assign_waves(
+        cohort["age"].values,
+        notnull(cohort["longres_dat"]).values,
+        cohort["shield_group"].values,
+        cohort["atrisk_group"].values,
     )
 
-    # Wave 7: Age 60 - 64
-    s.mask((s == 0) & (cohort["age"] >= 60), 7, inplace=True)
-
-    # Wave 8: Age 55 - 59
-    s.mask((s == 0) & (cohort["age"] >= 55), 8, inplace=True)
-
-    # Wave 9: Age 50 - 54
-    s.mask((s == 0) & (cohort["age"] >= 50), 9, inplace=True)
-
 
 def add_extra_at_risk_cols(cohort):
     """Add columns for extra at-risk groups."""
@@ -215,10 +267,37 @@ def add_extra_at_risk_cols(cohort):
     for col in extra_at_risk_cols:
         date_col = col.replace("_group", "_dat")
         if date_col in cohort.columns:
-            cohort[col] = cohort[date_col].notna()
+            cohort[col] = notnull(cohort[date_col])
+
+
+# Functions that transform() applies to the cohort, in order, with the columns that
+# each adds.  Each function only reads columns of the raw cohort, or columns added by
+# earlier functions.
+derivations = [
+    (add_imd_bands, ["imd_band"]),
+    (add_ethnicity, ["ethnicity"]),
+    (add_high_level_ethnicity, ["high_level_ethnicity"]),
+    (add_vacc_dates, ["vacc1_dat", "vacc2_dat"]),
+    (add_default_age_bands, ["age_band"]),
+    (add_groupings_numpy, list(groups)),
+    (add_waves, ["wave"]),
+    (add_extra_at_risk_cols, extra_at_risk_cols),
+]
 
 
 if __name__ == "__main__":
-    import sys
-
-    run(input_path=sys.argv[1])
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_path")
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--compact-dates", action="store_true")
+    parser.add_argument("--packed-groups", action="store_true")
+    args = parser.parse_args()
+
+    run(
+        input_path=args.input_path,
+        chunk_size=args.chunk_size,
+        compact_dates=args.compact_dates,
+        packed_groups=args.packed_groups,
+    )
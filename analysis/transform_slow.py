@@ -1,47 +1,162 @@
 import csv
-from tempfile import NamedTemporaryFile
+import io
+import os
+from array import array
+from multiprocessing import Pool
 
+import numpy as np
 import pandas as pd
 
-from age_bands import age_bands
-from add_groupings_2 import add_groupings_2
-from transform_fast import extra_at_risk_cols, extra_vacc_cols, necessary_cols
+from add_groupings_2 import (
+    add_groupings_2_block,
+    block_input_cols,
+    block_output_cols,
+)
+from bandings import assign_age_band, assign_imd_band, assign_wave
+from codelist_mappings import get_high_level_ethnicity_lookup
+from cohort_store import write_cohort
+from transform_fast import extra_at_risk_cols, necessary_cols, sex_categories
 
 
-def run(input_path="output/input.csv", output_path="output/cohort.pickle"):
-    with open(input_path) as f:
-        reader = csv.DictReader(f)
-        cohort = transform(reader)
-    cohort.to_pickle(output_path)
+band_cols = ["age_band", "ethnicity", "high_level_ethnicity", "imd_band", "wave"]
+group_cols = [col for col in necessary_cols if col.endswith("_group")]
+date_cols = [col for col in necessary_cols if col.endswith("_dat")]
+
+
+def run(
+    input_path="output/input.csv", output_path="output/cohort.parquet", processes=None
+):
+    """Transform the cohort, optionally in parallel across the given number of
+    processes.
+    """
+
+    if processes is None:
+        with open(input_path) as f:
+            reader = csv.DictReader(f)
+            cohort = transform(reader)
+    else:
+        cohort = transform_in_parallel(input_path, processes)
+    write_cohort(cohort, output_path)
 
 
 def transform(reader):
-    with NamedTemporaryFile("w+") as f:
-        writer = csv.DictWriter(f, necessary_cols)
-        writer.writeheader()
-        for row in transform_rows(reader):
-            writer.writerow(row)
-
-        f.seek(0)
-
-        # We set parse_dates and dtype to ensure that the returned dataframe is
-        # identical to that returned by the original transform.
-        date_fieldnames = [
-            fn
-            for fn in necessary_cols
-            if fn.endswith("_dat") and fn not in extra_vacc_cols
-        ]
-        dtypes = {
-            "ethnicity": "int8",
-            "high_level_ethnicity": "int8",
-        }
-        cohort = pd.read_csv(f.name, parse_dates=date_fieldnames, dtype=dtypes)
-
-    return cohort[necessary_cols]
-
-
-def transform_rows(rows):
-    for ix, row in enumerate(rows):
+    return build_cohort(transform_rows(reader))
+
+
+def transform_in_parallel(input_path, processes, num_shards=None):
+    """Transform the cohort by splitting the input file into shards, each of which is
+    transformed in a separate process.
+
+    Transformed shards are concatenated in the order of the input file, so the result
+    is identical to that returned by transform().
+
+    Shards are split on line boundaries, so this assumes that no field in the input
+    contains a newline, which holds for files generated by cohortextractor.
+    """
+
+    if num_shards is None:
+        # Using more shards than processes keeps all processes busy until the end.
+        num_shards = 4 * processes
+
+    shards = get_shards(input_path, num_shards)
+
+    with Pool(processes) as pool:
+        transformed_shards = pool.imap(transform_shard, shards)
+        return pd.concat(transformed_shards, ignore_index=True)
+
+
+def get_shards(input_path, num_shards):
+    """Return list of (input_path, fieldnames, start, end) tuples, where start and end
+    are byte offsets of line boundaries in the input file, covering every line after
+    the header.
+    """
+
+    with open(input_path, "rb") as f:
+        header = f.readline()
+        header_end = f.tell()
+        file_end = f.seek(0, os.SEEK_END)
+
+        boundaries = [header_end]
+        for ix in range(1, num_shards):
+            f.seek(header_end + ix * (file_end - header_end) // num_shards)
+            f.readline()
+            boundaries.append(max(f.tell(), boundaries[-1]))
+        boundaries.append(file_end)
+
+    fieldnames = next(csv.reader([header.decode("utf8")]))
+
+    return [
+        (input_path, fieldnames, start, end)
+        for start, end in zip(boundaries, boundaries[1:])
+        if start < end
+    ]
+
+
+def transform_shard(shard):
+    """Return cohort DataFrame built from the given shard of the input file."""
+
+    input_path, fieldnames, start, end = shard
+
+    with open(input_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    reader = csv.DictReader(io.StringIO(data.decode("utf8"), newline=""), fieldnames)
+    return build_cohort(transform_rows(reader))
+
+
+def build_cohort(rows):
+    """Build cohort DataFrame from transformed rows.
+
+    Values are appended to typed column buffers as rows are produced, so that there
+    is no intermediate text representation of the cohort.  The dtypes of the
+    returned DataFrame are identical to those returned by transform_fast.transform().
+    """
+
+    buffers = {}
+    for col in necessary_cols:
+        if col in band_cols:
+            buffers[col] = array("b")
+        elif col in group_cols:
+            buffers[col] = array("B")
+        else:
+            buffers[col] = []
+
+    for row in rows:
+        for col, buffer in buffers.items():
+            buffer.append(row[col])
+
+    columns = {}
+    for col, buffer in buffers.items():
+        if col in band_cols:
+            columns[col] = np.frombuffer(buffer, dtype="int8")
+        elif col in group_cols:
+            columns[col] = np.frombuffer(buffer, dtype="uint8").astype(bool)
+        elif col == "patient_id":
+            columns[col] = np.array(buffer, dtype="int64")
+        elif col in date_cols:
+            # numpy parses empty strings as NaT
+            columns[col] = np.array(buffer, dtype="datetime64[D]").astype(
+                "datetime64[ns]"
+            )
+        elif col == "sex":
+            columns[col] = pd.Categorical(buffer, categories=sex_categories)
+        else:
+            assert False, col
+
+    return pd.DataFrame(columns)
+
+
+def transform_rows(rows, block_size=10000):
+    """Yield transformed rows.
+
+    Groupings are added to blocks of up to block_size rows at a time, so that each
+    grouping is evaluated across a whole block, rather than once per row.
+    """
+
+    block = []
+
+    for row in rows:
         if non_fm_sex(row):
             continue
         if over_120_age(row):
@@ -53,11 +168,33 @@ def transform_rows(rows):
         add_missing_vacc_columns(row)
         add_vacc_dates(row)
         add_age_bands(row, range(1, 12 + 1))
-        add_groupings_2(row)
+        block.append(row)
+
+        if len(block) == block_size:
+            yield from transform_block(block)
+            block = []
+
+    yield from transform_block(block)
+
+
+def transform_block(rows):
+    add_groupings(rows)
+
+    for row in rows:
         add_waves(row)
         add_extra_at_risk_cols(row)
-        row = {k: v for k, v in row.items() if k in necessary_cols}
-        yield row
+        yield {col: row[col] for col in necessary_cols}
+
+
+def add_groupings(rows):
+    """Add groupings to each of rows, evaluating each grouping across all rows."""
+
+    block = {col: [row[col] for row in rows] for col in block_input_cols}
+    add_groupings_2_block(block)
+
+    for col in block_output_cols:
+        for row, value in zip(rows, block[col]):
+            row[col] = value
 
 
 def non_fm_sex(row):
@@ -80,12 +217,8 @@ def add_imd_bands(row):
 
     if not row["imd"]:
         row["imd_band"] = 0
-        return
-
-    for band in range(1, 5 + 1):
-        if int(row["imd"]) < band * 32844 / 5:
-            row["imd_band"] = band
-            return
+    else:
+        row["imd_band"] = assign_imd_band(float(row["imd"]))
 
 
 def add_ethnicity(row):
@@ -115,21 +248,9 @@ def add_ethnicity(row):
 def add_high_level_ethnicity(row):
     """Add high-level ethnicity categories, based on bandings from PRIMIS spec."""
 
-    # Get mapping from category (1-16) to high-level category (1-5)
-    category_to_high_level_category = {}
-    with open("codelists/primis-covid19-vacc-uptake-eth2001.csv") as f:
-        for record in csv.DictReader(f):
-            category = int(record["grouping_16_id"])
-            high_level_category = int(record["grouping_6_id"])
-
-            if category in category_to_high_level_category:
-                assert category_to_high_level_category[category] == high_level_category
-            else:
-                category_to_high_level_category[category] = high_level_category
-
-    # Set high_level_ethnicity based on ethnicity column
-    row["high_level_ethnicity"] = category_to_high_level_category.get(
-        row["ethnicity"], 6  # 6 is "unknown"
+    # Map category (1-20) to high-level category (1-6)
+    row["high_level_ethnicity"] = int(
+        get_high_level_ethnicity_lookup()[row["ethnicity"]]
     )
 
 
@@ -165,63 +286,17 @@ def add_vacc_dates(row):
 
 
 def add_age_bands(row, bands):
-    for band in bands:
-        lower, upper = age_bands[band]
-        if lower is None:
-            lower = -1
-        if upper is None:
-            upper = 999
-        if lower <= int(row["age"]) < upper:
-            row["age_band"] = band
-            return
-
-    assert False
+    row["age_band"] = assign_age_band(int(row["age"]), bands)
+    assert row["age_band"]
 
 
 def add_waves(row):
-    age = int(row["age"])
-
-    if row["longres_dat"]:
-        # Wave 1: Residents in Care Homes
-        # (The spec includes staff in care homes, but occupation codes are not well
-        # recorded)
-        row["wave"] = 1
-
-    elif age >= 80:
-        # Wave 2: Age 80 or over
-        # (This spec includes frontline H&SC workers, but see above.)
-        row["wave"] = 2
-
-    elif 75 <= age <= 79:
-        # Wave 3: Age 75 - 79
-        row["wave"] = 3
-
-    elif row["shield_group"] or (70 <= age <= 74):
-        # Wave 4: Clinically Extremely Vulnerable or age 70 - 74
-        row["wave"] = 4
-
-    elif 65 <= age <= 69:
-        # Wave 5: Age 65 - 69
-        row["wave"] = 5
-
-    elif (16 <= age <= 64) and row["atrisk_group"]:
-        # Wave 6: Age 16-64 in a defined At Risk group
-        row["wave"] = 6
-
-    elif 60 <= age <= 64:
-        # Wave 7: Age 60 - 64
-        row["wave"] = 7
-
-    elif 55 <= age <= 59:
-        # Wave 8: Age 55 - 59
-        row["wave"] = 8
-
-    elif 50 <= age <= 54:
-        # Wave 9: Age 50 - 54
-        row["wave"] = 9
-
-    else:
-        row["wave"] = 0
+    row["wave"] = assign_wave(
+        int(row["age"]),
+        row["longres_dat"],
+        row["shield_group"],
+        row["atrisk_group"],
+    )
 
 
 def add_extra_at_risk_cols(row):
@@ -236,4 +311,5 @@ def add_extra_at_risk_cols(row):
 if __name__ == "__main__":
     import sys
 
-    run(input_path=sys.argv[1])
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    run(input_path=sys.argv[1], processes=processes)
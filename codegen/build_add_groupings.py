@@ -9,18 +9,27 @@ def run(spec_path):
     with open(spec_path) as f:
         spec = json.load(f)
 
-    out_path = (
-        Path(os.path.abspath(__file__)).parents[1] / "analysis" / "add_groupings.py"
-    )
+    analysis_dir = Path(os.path.abspath(__file__)).parents[1] / "analysis"
+    groupings = list(get_groupings(spec))
+
+    out_path = analysis_dir / "add_groupings.py"
 
     with open(out_path, "w") as f:
-        write_add_groupings(get_groupings(spec), f)
+        write_add_groupings(groupings, f)
+
+    os.system(f"black {out_path}")
+
+    out_path = analysis_dir / "add_groupings_numpy.py"
+
+    with open(out_path, "w") as f:
+        write_add_groupings_numpy(groupings, f)
 
     os.system(f"black {out_path}")
 
 
 def write_add_groupings(groupings, f):
-    f.write("from comparisons import gt, gte, lt, lte\n\n\n")
+    f.write("from comparisons import gt, gte, lt, lte\n")
+    f.write("from day_offsets import isnull, notnull\n\n\n")
     f.write("def add_groupings(df):\n")
     for g in groupings:
         f.write(f"    # {g['group']}\n")
@@ -33,6 +42,59 @@ def write_add_groupings(groupings, f):
         f.write(f'    df["{g["column"]}"] = {g["expr"]}\n\n')
 
 
+def write_add_groupings_numpy(groupings, f):
+    """Write add_groupings_numpy(), which evaluates each grouping with NumPy ufuncs
+    that write into preallocated arrays.
+
+    Each column of df is converted to arrays of ordinals and validity masks (or of
+    values) once, and each group is evaluated into its own array, which is reused by
+    any later group that refers to it.  Intermediate results are written into scratch
+    arrays tmp0, tmp1, and so on, one for each level of nesting that any grouping
+    needs, which are allocated once and shared by all groupings.
+    """
+
+    f.write("import numpy as np\n\n")
+    f.write("from day_offsets import to_ordinals\n\n\n")
+    f.write("def add_groupings_numpy(df):\n")
+
+    kernels = []
+    num_scratch = 0
+    for g in groupings:
+        lines, n = render_numpy_kernel(g["tree"], g["column"])
+        kernels.append(lines)
+        num_scratch = max(num_scratch, n)
+
+    group_cols = {g["column"] for g in groupings}
+    date_cols, value_cols = get_input_cols([g["tree"] for g in groupings], group_cols)
+
+    for col, needs_ordinals in date_cols.items():
+        if needs_ordinals:
+            f.write(f'    {col}_ordinals, {col}_mask = to_ordinals(df["{col}"])\n')
+        else:
+            f.write(f'    _, {col}_mask = to_ordinals(df["{col}"])\n')
+    for col in value_cols:
+        f.write(f'    {col} = df["{col}"].values\n')
+    f.write("\n")
+
+    f.write("    n = len(df)\n")
+    for ix in range(num_scratch):
+        f.write(f"    tmp{ix} = np.empty(n, dtype=bool)\n")
+    f.write("\n")
+
+    for g, lines in zip(groupings, kernels):
+        f.write(f"    # {g['group']}\n")
+        f.write("    #\n")
+        max_width = max(len(r[0]) for r in g["rows"])
+        for r in g["rows"]:
+            f.write(
+                f"    # {r[0].ljust(max_width)} | {r[1].ljust(6)} | {r[2].ljust(6)}\n"
+            )
+        f.write(f"    {g['column']} = np.empty(n, dtype=bool)\n")
+        for line in lines:
+            f.write(f"    {line}\n")
+        f.write(f'    df["{g["column"]}"] = {g["column"]}\n\n')
+
+
 def get_groupings(spec):
     for g in spec["bandings_and_groupings"][3:]:
         column = g["banding_key"].lower().replace("*", "")
@@ -51,6 +113,7 @@ def get_groupings(spec):
             "rows": g["rows"],
             "column": column,
             "expr": rendered,
+            "tree": expr,
         }
 
 
@@ -212,15 +275,179 @@ def render_expr(expr):
 
     if op == "null":
         val = operands[0]
-        return f"{render_expr(val)}.isnull()"
+        return f"isnull({render_expr(val)})"
 
     if op == "notnull":
         val = operands[0]
-        return f"{render_expr(val)}.notnull()"
+        return f"notnull({render_expr(val)})"
 
     assert False, op
 
 
+def get_input_cols(exprs, group_cols):
+    """Return dict mapping each date column referenced by exprs to whether its ordinals
+    (and not just its validity mask) are needed, and list of other columns whose values
+    are needed.
+
+    Columns in group_cols are computed by earlier groupings, and are not included.
+    """
+
+    date_cols = {}
+    value_cols = []
+
+    def visit(expr):
+        op, operands = expr
+
+        if op == "L":
+            col = operands[0]
+            if col not in group_cols:
+                date_cols.setdefault(col, False)
+
+        elif op in [">", ">=", "<", "<="]:
+            lhs, rhs = operands
+            if rhs[0] == "V":
+                col = lhs[1][0]
+                if col not in value_cols:
+                    value_cols.append(col)
+            else:
+                date_cols[lhs[1][0]] = True
+                date_cols[rhs[1][0]] = True
+
+        elif op == "~":
+            visit(operands)
+
+        elif op in ["&", "|", "null", "notnull"]:
+            for operand in operands:
+                visit(operand)
+
+        else:
+            assert False, op
+
+    for expr in exprs:
+        visit(expr)
+
+    return date_cols, value_cols
+
+
+def get_numpy_array(expr):
+    """Return name of existing array holding the value of expr, or None if expr has to
+    be computed.
+    """
+
+    op, operands = expr
+
+    if op == "L":
+        # A reference to an already-computed group
+        return operands[0]
+
+    if op == "notnull":
+        col = operands[0][1][0]
+        return f"{col}_mask"
+
+    return None
+
+
+def render_numpy_kernel(expr, out, depth=0, implied=()):
+    """Return lines of code that evaluate expr into the boolean array out, and the
+    number of scratch arrays that the code needs.
+
+    The code uses scratch arrays tmp<depth>, tmp<depth + 1>, and so on.
+
+    implied holds the names of arrays that the result will be and-ed with anyway, so
+    that the code need not and the result with them.
+    """
+
+    op, operands = expr
+
+    if op in ["&", "|"]:
+        fn = {"&": "np.logical_and", "|": "np.logical_or"}[op]
+
+        if op == "&":
+            # A & B & C where each is null(X) is computed as ~(X_A | X_B | X_C)
+            nulls = [operand for operand in operands if operand[0] == "null"]
+            if len(nulls) > 1:
+                operands = [operand for operand in operands if operand[0] != "null"]
+                operands.append(["nor", [["notnull", null[1]] for null in nulls]])
+
+        arrays = [get_numpy_array(operand) for operand in operands]
+
+        # Operands that must be computed are evaluated first, so that the first can be
+        # evaluated directly into out.  The order does not change the result, since
+        # evaluation has no side effects.
+        computed = [o for o, array in zip(operands, arrays) if array is None]
+        existing = []
+        for array in arrays:
+            if array is not None and array not in existing:
+                existing.append(array)
+
+        if op == "&":
+            implied = set(implied) | set(existing)
+        else:
+            implied = ()
+
+        lines = []
+        num_scratch = 0
+
+        for ix, operand in enumerate(computed):
+            if ix == 0:
+                sub_lines, n = render_numpy_kernel(operand, out, depth, implied)
+                lines.extend(sub_lines)
+                num_scratch = max(num_scratch, n)
+            else:
+                tmp = f"tmp{depth}"
+                sub_lines, n = render_numpy_kernel(operand, tmp, depth + 1, implied)
+                lines.extend(sub_lines)
+                lines.append(f"{fn}({out}, {tmp}, out={out})")
+                num_scratch = max(num_scratch, n, depth + 1)
+
+        if not computed:
+            first, second, *existing = existing
+            lines.append(f"{fn}({first}, {second}, out={out})")
+
+        for array in existing:
+            lines.append(f"{fn}({out}, {array}, out={out})")
+
+        return lines, num_scratch
+
+    if op == "nor":
+        lines, num_scratch = render_numpy_kernel(["|", operands], out, depth)
+        lines.append(f"np.logical_not({out}, out={out})")
+        return lines, num_scratch
+
+    if op in [">", ">=", "<", "<="]:
+        lhs, rhs = operands
+        fn = {
+            ">": "np.greater",
+            ">=": "np.greater_equal",
+            "<": "np.less",
+            "<=": "np.less_equal",
+        }[op]
+
+        if rhs[0] == "V":
+            return [f"{fn}({lhs[1][0]}, {rhs[1][0]!r}, out={out})"], 0
+
+        # Missing dates are less than every other date (see day_offsets.to_ordinals()),
+        # so only >= and <= need to check for missing values.  See comparisons.py.
+        lhs_col = lhs[1][0]
+        rhs_col = rhs[1][0]
+        lines = [f"{fn}({lhs_col}_ordinals, {rhs_col}_ordinals, out={out})"]
+        mask = {">=": f"{lhs_col}_mask", "<=": f"{rhs_col}_mask"}.get(op)
+        if mask is not None and mask not in implied:
+            lines.append(f"np.logical_and({out}, {mask}, out={out})")
+        return lines, 0
+
+    if op == "null":
+        col = operands[0][1][0]
+        return [f"np.logical_not({col}_mask, out={out})"], 0
+
+    if op == "~":
+        return [f"np.logical_not({operands[1][0]}, out={out})"], 0
+
+    array = get_numpy_array(expr)
+    assert array is not None, op
+    return [f"np.copyto({out}, {array})"], 0
+
+
 if __name__ == "__main__":
     import sys
 
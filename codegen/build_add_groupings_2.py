@@ -68,6 +68,8 @@ def add_groupings_2(row):
         f.write("\n")
 
         f.write("\n\n")
+    write_add_groupings_2_block(groupings, f)
+
     f.write(
         """
 def gt(lhs, rhs):
@@ -95,6 +97,100 @@ def gte(lhs, rhs):
     )
 
 
+def write_add_groupings_2_block(groupings, f):
+    """Write add_groupings_2_block(), which evaluates each grouping across a block of
+    rows held as a dict mapping each column to a list of values.
+
+    Each grouping is evaluated by a single list comprehension over the columns that it
+    refers to, so that there is no per-row function call (other than to gt() and
+    gte()) or dict lookup.
+    """
+
+    group_cols = [g["column"] for g in groupings]
+    input_cols = []
+    for g in groupings:
+        for col in get_cols(g["steps"]):
+            if col not in group_cols and col not in input_cols:
+                input_cols.append(col)
+
+    f.write("# Columns of the rows that add_groupings_2_block() reads\n")
+    f.write(f"block_input_cols = {input_cols!r}\n\n")
+    f.write("# Columns that add_groupings_2_block() adds\n")
+    f.write(f"block_output_cols = {group_cols!r}\n\n\n")
+
+    f.write("def add_groupings_2_block(block):\n")
+    for g in groupings:
+        cols = get_cols(g["steps"])
+        if len(cols) == 1:
+            target = cols[0]
+            iterable = f'block["{cols[0]}"]'
+        else:
+            target = ", ".join(cols)
+            iterable = "zip(" + ", ".join(f'block["{col}"]' for col in cols) + ")"
+
+        f.write(f'    block["{g["column"]}"] = [\n')
+        f.write(f"        {render_steps_expr(g['steps'])}\n")
+        f.write(f"        for {target} in {iterable}\n")
+        f.write("    ]\n\n")
+    f.write("\n\n")
+
+
+def get_cols(steps):
+    """Return list of columns referred to by steps, in order of first reference."""
+
+    cols = []
+
+    def visit(expr):
+        op, operands = expr
+        if op == "L":
+            if operands[0] not in cols:
+                cols.append(operands[0])
+        elif op != "V":
+            for operand in operands:
+                visit(operand)
+
+    for _, _, expr in steps:
+        visit(expr)
+
+    return cols
+
+
+def render_steps_expr(steps):
+    """Return a single expression that evaluates to True or False, following the given
+    steps, with columns rendered as bare names.
+
+    A step that selects or rejects when its condition holds, and otherwise moves on to
+    the next step, becomes a term in a chain of "or"s or "and"s.
+    """
+
+    def render(expr):
+        return render_expr(expr, render_col=str)
+
+    _, (action_true, _), expr = steps[-1]
+    if action_true == "Select":
+        op, terms = None, [render(expr)]
+    else:
+        op, terms = None, [f"not {render(expr)}"]
+
+    for _, (action_true, action_false), expr in reversed(steps[:-1]):
+        if action_true == "Select":
+            step_op, term = "or", render(expr)
+        elif action_true == "Reject":
+            step_op, term = "and", render(negate_expr(expr))
+        elif action_false == "Select":
+            step_op, term = "or", render(negate_expr(expr))
+        else:
+            step_op, term = "and", render(expr)
+
+        if op in [None, step_op]:
+            terms = [term] + terms
+        else:
+            terms = [term, "(" + f" {op} ".join(terms) + ")"]
+        op = step_op
+
+    return "bool(" + f" {op} ".join(terms) + ")"
+
+
 def get_groupings(spec):
     for g in spec["bandings_and_groupings"][3:]:
         column = g["banding_key"].lower().replace("*", "")
@@ -190,12 +286,12 @@ def negate_expr(expr):
     assert False, op
 
 
-def render_expr(expr):
+def render_expr(expr, render_col=lambda col: f'row["{col}"]'):
     op, operands = expr
 
     if op == "L":
         col = operands[0]
-        return f'row["{col}"]'
+        return render_col(col)
 
     if op == "V":
         val = operands[0]
@@ -203,26 +299,27 @@ def render_expr(expr):
 
     if op == ">":
         lhs, rhs = operands
-        return f"gt({render_expr(lhs)}, {render_expr(rhs)})"
+        return f"gt({render_expr(lhs, render_col)}, {render_expr(rhs, render_col)})"
 
     if op == ">=":
         lhs, rhs = operands
-        return f"gte({render_expr(lhs)}, {render_expr(rhs)})"
+        return f"gte({render_expr(lhs, render_col)}, {render_expr(rhs, render_col)})"
 
     if op in ["&", "|"]:
         op = {"&": "and", "|": "or"}[op]
-        return "(" + f" {op} ".join(render_expr(operand) for operand in operands) + ")"
+        rendered = [render_expr(operand, render_col) for operand in operands]
+        return "(" + f" {op} ".join(rendered) + ")"
 
     if op == "null":
         val = operands[0]
-        return f"not {render_expr(val)}"
+        return f"not {render_expr(val, render_col)}"
 
     if op == "notnull":
         val = operands[0]
-        return f"{render_expr(val)}"
+        return f"{render_expr(val, render_col)}"
 
     if op == "~":
-        return f"not {render_expr(operands)}"
+        return f"not {render_expr(operands, render_col)}"
 
     assert False, op
 
@@ -0,0 +1,83 @@
+import json
+import os
+from pathlib import Path
+
+from build_study_definition import get_study_definition_params
+
+
+def run(spec_path):
+    with open(spec_path) as f:
+        spec = json.load(f)
+
+    study_definition_params = get_study_definition_params(spec["extraction_criteria"])
+
+    out_path = Path(os.path.abspath(__file__)).parents[1] / "analysis" / "schema.py"
+
+    with open(out_path, "w") as f:
+        write_schema(list(get_schema(study_definition_params)), f)
+
+    os.system(f"black {out_path}")
+
+
+def write_schema(schema, f):
+    dtypes = {name: dtype for name, dtype in schema if dtype != "date"}
+    date_cols = [name for name, dtype in schema if dtype == "date"]
+
+    f.write("import pandas as pd\n\n\n")
+    f.write(
+        "# Mapping from column of the raw cohort to the dtype it is loaded with.\n"
+    )
+    f.write("raw_cohort_dtypes = {\n")
+    for name, dtype in dtypes.items():
+        f.write(f'    "{name}": {dtype},\n')
+    f.write("}\n\n")
+    f.write("# Columns of the raw cohort that are parsed as dates.\n")
+    f.write(f"raw_cohort_date_cols = {date_cols}\n")
+
+
+def get_schema(study_definition_params):
+    yield "patient_id", '"int64"'
+
+    for param in study_definition_params:
+        name = param["name"]
+        returning = param["kwargs"].get("returning")
+
+        if param["type"] == "registered_as_of":
+            # The population is not a column of the generated cohort
+            continue
+
+        if param["type"] == "age_as_of":
+            yield name, '"int16"'
+
+        elif param["type"] == "sex":
+            ratios = param["kwargs"]["return_expectations"]["category"]["ratios"]
+            yield name, f"pd.CategoricalDtype({list(ratios)})"
+
+        elif returning == '"index_of_multiple_deprivation"':
+            # IMD ranks are integers below 2**24, so are exactly representable as
+            # float32, which (unlike int) allows for missing values.
+            yield name, '"float32"'
+
+        elif returning == '"stp_code"':
+            yield name, '"category"'
+
+        elif returning == '"category"':
+            # Ethnicity categories are small integers, or missing
+            yield name, '"float32"'
+
+        elif returning == '"numeric_value"':
+            # We keep full precision so that comparisons against thresholds agree
+            # with those made against the raw values in transform_slow.
+            yield name, '"float64"'
+
+        elif returning == '"date"':
+            yield name, "date"
+
+        else:
+            assert False, name
+
+
+if __name__ == "__main__":
+    import sys
+
+    run(sys.argv[1])
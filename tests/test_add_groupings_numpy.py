@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from analysis.add_groupings import add_groupings
+from analysis.add_groupings_numpy import add_groupings_numpy
+from analysis.day_offsets import encode, to_ordinals
+from analysis.groups import groups
+from analysis.transform_fast import load_raw_cohort, transform
+
+
+@pytest.mark.parametrize("compact_dates", [False, True])
+def test_add_groupings_numpy(compact_dates):
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort, compact_dates=compact_dates)
+
+    expected = cohort.copy()
+    add_groupings(expected)
+    actual = cohort.copy()
+    add_groupings_numpy(actual)
+
+    assert_frame_equal(actual[list(groups)], expected[list(groups)])
+
+
+def test_to_ordinals():
+    dates = pd.to_datetime(pd.Series(["2021-01-02", None, "1900-01-01", "2021-01-01"]))
+    missing = pd.Series([np.nan] * 4)
+
+    for series in [dates, encode(dates)]:
+        ordinals, mask = to_ordinals(series)
+        assert list(mask) == [True, False, True, True]
+        assert list(np.argsort(ordinals)) == [1, 2, 3, 0]
+
+        missing_ordinals, missing_mask = to_ordinals(missing)
+        assert not missing_mask.any()
+        assert (missing_ordinals < ordinals[mask].min()).all()
+
+    with pytest.raises(TypeError):
+        to_ordinals(pd.Series([1.0, np.nan]))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from analysis.bandings import (
+    assign_age_band,
+    assign_age_bands,
+    assign_imd_band,
+    assign_imd_bands,
+    assign_wave,
+    assign_waves,
+    get_age_band_edges,
+)
+
+
+def test_assign_age_bands():
+    ages = np.arange(120, dtype="int16")
+    bands = assign_age_bands(ages, range(1, 12 + 1))
+
+    assert bands.dtype == "int8"
+    assert list(bands) == [assign_age_band(age, range(1, 12 + 1)) for age in ages]
+    assert list(bands[[0, 15, 16, 29, 30, 84, 85, 119]]) == [1, 1, 2, 2, 3, 11, 12, 12]
+
+
+def test_get_age_band_edges_requires_contiguous_bands():
+    with pytest.raises(ValueError):
+        get_age_band_edges((1, 3))
+
+
+def test_assign_imd_bands():
+    imds = np.array([np.nan, 0, 1, 6568, 6569, 32843, 32844], dtype="float32")
+    bands = assign_imd_bands(imds)
+
+    assert bands.dtype == "int8"
+    assert list(bands) == [0, 0, 1, 1, 2, 5, 0]
+    assert list(bands[1:]) == [assign_imd_band(imd) for imd in imds[1:]]
+
+
+def test_assign_waves():
+    ages = np.repeat(np.arange(100, dtype="int16"), 8)
+    longres = np.tile([False, True], 400)
+    shield = np.tile([False, False, True, True], 200)
+    atrisk = np.tile([False] * 4 + [True] * 4, 100)
+    waves = assign_waves(ages, longres, shield, atrisk)
+
+    assert waves.dtype == "int8"
+    assert list(waves) == [
+        assign_wave(*args) for args in zip(ages, longres, shield, atrisk)
+    ]
+    assert list(waves[ages == 40]) == [0, 1, 4, 1, 6, 1, 4, 1]
+    assert list(waves[ages == 77]) == [3, 1, 3, 1, 3, 1, 3, 1]
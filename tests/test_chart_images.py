@@ -0,0 +1,19 @@
+import base64
+
+from analysis.chart_images import get_chart_src
+
+
+def test_get_chart_src(tmp_path):
+    charts_path = tmp_path / "charts"
+    reports_path = tmp_path / "reports"
+    charts_path.mkdir()
+    chart_path = charts_path / "chart.png"
+    chart_path.write_bytes(b"png")
+    encoded = base64.b64encode(b"png").decode("utf8")
+
+    assert get_chart_src(chart_path, reports_path) == f"data:image/png;base64,{encoded}"
+    assert (
+        get_chart_src(chart_path, reports_path, {chart_path: "abc"})
+        == "data:image/png;base64,abc"
+    )
+    assert get_chart_src(chart_path, reports_path, link=True) == "../charts/chart.png"
@@ -0,0 +1,36 @@
+import pytest
+
+from analysis.codelist_mappings import (
+    get_ethnicity_to_high_level_ethnicity,
+    get_high_level_ethnicity_labels,
+    get_high_level_ethnicity_lookup,
+    load_grouping,
+)
+
+
+def test_get_high_level_ethnicity_lookup():
+    lookup = get_high_level_ethnicity_lookup()
+    mapping = get_ethnicity_to_high_level_ethnicity()
+
+    assert lookup.dtype == "int8"
+    assert sorted(mapping) == list(range(1, 16 + 1))
+    for category in range(1, 20 + 1):
+        assert lookup[category] == mapping.get(category, 6)
+
+    assert list(lookup[[1, 8, 20]]) == [mapping[1], mapping[8], 6]
+    assert get_high_level_ethnicity_lookup() is lookup
+    assert not lookup.flags.writeable
+
+
+def test_get_high_level_ethnicity_labels():
+    labels = get_high_level_ethnicity_labels()
+    assert sorted(labels) == [1, 2, 3, 4, 5, 6]
+    assert labels[6] == "Unknown"
+
+
+def test_load_grouping_with_inconsistent_grouping(tmp_path):
+    path = tmp_path / "codelist.csv"
+    path.write_text("code,group\n1,A\n2,B\n1,B\n")
+
+    with pytest.raises(ValueError):
+        load_grouping(path, "code", "group")
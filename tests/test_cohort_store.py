@@ -0,0 +1,23 @@
+from pandas.testing import assert_frame_equal
+
+from analysis.cohort_store import (
+    read_cohort,
+    read_cohort_columns,
+    write_cohort_in_chunks,
+)
+from analysis.transform_fast import load_raw_cohort, necessary_cols, transform
+
+
+def test_write_cohort_in_chunks(tmp_path):
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)[necessary_cols].reset_index(drop=True)
+    path = tmp_path / "cohort.parquet"
+
+    chunks = [cohort.iloc[ix : ix + 1000] for ix in range(0, len(cohort), 1000)]
+    write_cohort_in_chunks(chunks, path)
+
+    assert read_cohort_columns(path) == necessary_cols
+    assert_frame_equal(read_cohort(path), cohort)
+    assert_frame_equal(
+        read_cohort(path, ["wave", "vacc1_dat"]), cohort[["wave", "vacc1_dat"]]
+    )
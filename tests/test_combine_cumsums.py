@@ -1,4 +1,4 @@
-from pandas.testing import assert_index_equal, assert_series_equal
+from pandas.testing import assert_frame_equal, assert_index_equal, assert_series_equal
 
 from analysis.combine_cumsums import combine_cumsums
 from analysis.compute_uptake import compute_uptake
@@ -63,3 +63,19 @@ def test_combine_cumsums():
     assert_series_equal(
         combined.loc["total"], uptake1.loc["total"] + uptake2.loc["total"]
     )
+
+
+def test_combine_cumsums_of_many():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)
+    uptake = compute_uptake(cohort, "vacc1_dat", "imd_band")
+
+    uptake1 = uptake.drop(uptake.iloc[-3:-1].index).loc[:, 0:4]
+    uptake2 = uptake.drop(uptake.iloc[:2].index).loc[:, 1:5]
+    uptake3 = uptake.drop(uptake.iloc[:4].index).loc[:, 2:3]
+
+    combined = combine_cumsums(uptake1, uptake2, uptake3)
+
+    assert_frame_equal(
+        combined, combine_cumsums(combine_cumsums(uptake1, uptake2), uptake3)
+    )
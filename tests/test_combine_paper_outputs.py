@@ -0,0 +1,75 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from analysis import combine_paper_outputs, compute_uptake_for_paper, transform_fast
+
+
+def test_run_batch(tmp_path, monkeypatch):
+    cohort_path = tmp_path / "cohort.parquet"
+    transform_fast.run("tests/input.csv", cohort_path)
+    compute_uptake_for_paper.run(cohort_path, tmp_path)
+
+    for run_dir, run in [
+        ("serial", combine_paper_outputs.run),
+        ("batch", lambda: combine_paper_outputs.run_batch(processes=2, threads=2)),
+    ]:
+        for backend in ["emis", "tpp"]:
+            shutil.copytree(
+                tmp_path / "expectations",
+                tmp_path / run_dir / "released_outputs" / backend,
+            )
+        monkeypatch.chdir(tmp_path / run_dir)
+        run()
+
+    serial_dir = tmp_path / "serial" / "released_outputs" / "combined"
+    batch_dir = tmp_path / "batch" / "released_outputs" / "combined"
+    serial_paths = sorted(p.relative_to(serial_dir) for p in serial_dir.rglob("*.csv"))
+    batch_paths = sorted(p.relative_to(batch_dir) for p in batch_dir.rglob("*.csv"))
+    assert serial_paths
+    assert serial_paths == batch_paths
+
+    for path in serial_paths:
+        assert (serial_dir / path).read_bytes() == (batch_dir / path).read_bytes()
+
+
+def test_run_with_missing_outputs(tmp_path):
+    cohort_path = tmp_path / "cohort.parquet"
+    transform_fast.run("tests/input.csv", cohort_path)
+    compute_uptake_for_paper.run(cohort_path, tmp_path)
+
+    backend_dirs = [str(tmp_path / backend) for backend in ["a", "b", "c"]]
+    for backend_dir in backend_dirs:
+        shutil.copytree(tmp_path / "expectations", backend_dir)
+
+    path = "cumulative_coverage/all/dose_1/all_dose_1_by_group.csv"
+    (Path(backend_dirs[2]) / path).unlink()
+
+    with pytest.raises(FileNotFoundError):
+        combine_paper_outputs.run(backend_dirs, tmp_path / "combined")
+
+    combine_paper_outputs.run(backend_dirs, tmp_path / "skip_file", "skip_file")
+    assert not (tmp_path / "skip_file" / path).exists()
+
+    combine_paper_outputs.run(backend_dirs, tmp_path / "skip_backend", "skip_backend")
+    combined = pd.read_csv(tmp_path / "skip_backend" / path, index_col=0)
+    expected = pd.read_csv(tmp_path / "expectations" / path, index_col=0) * 2
+    assert_frame_equal(combined, expected)
+
+    combine_paper_outputs.run_batch(
+        backend_dirs, tmp_path / "batch", "skip_backend", processes=2, threads=2
+    )
+    serial_paths = get_relative_paths(tmp_path / "skip_backend")
+    assert len(serial_paths) > 1
+    assert get_relative_paths(tmp_path / "batch") == serial_paths
+
+    for path in serial_paths:
+        serial_bytes = (tmp_path / "skip_backend" / path).read_bytes()
+        assert (tmp_path / "batch" / path).read_bytes() == serial_bytes, path
+
+
+def get_relative_paths(root):
+    return sorted(path.relative_to(root) for path in Path(root).rglob("*.csv"))
@@ -3,6 +3,7 @@ import pandas as pd
 from pandas.testing import assert_series_equal
 
 from analysis.comparisons import gt, gte, lt, lte
+from analysis.day_offsets import NULL_DAY, encode
 
 
 def test_comparisons():
@@ -35,3 +36,37 @@ def test_comparisons():
     assert_series_equal(gte(df["a"], df["b"]), df["gte"], check_names=False)
     assert_series_equal(lt(df["a"], df["b"]), df["lt"], check_names=False)
     assert_series_equal(lte(df["a"], df["b"]), df["lte"], check_names=False)
+
+
+def test_comparisons_with_day_offsets():
+    T = True
+    F = False
+
+    df = pd.DataFrame.from_records(
+        [
+            ("2021-01-01", "2021-01-01", F, T, F, T),
+            ("2021-01-01", "2021-01-02", F, F, T, T),
+            ("2021-01-02", "2021-01-01", T, T, F, F),
+            ("2021-01-01", None, T, T, F, F),
+            (None, "2021-01-01", F, F, T, T),
+            (None, None, F, F, F, F),
+        ],
+        columns=["a", "b", "gt", "gte", "lt", "lte"],
+    )
+    a = encode(pd.to_datetime(df["a"]).rename("a_dat"))
+    b = encode(pd.to_datetime(df["b"]).rename("b_dat"))
+
+    assert_series_equal(gt(a, b), df["gt"], check_names=False)
+    assert_series_equal(gte(a, b), df["gte"], check_names=False)
+    assert_series_equal(lt(a, b), df["lt"], check_names=False)
+    assert_series_equal(lte(a, b), df["lte"], check_names=False)
+
+
+def test_comparisons_with_int16_non_dates():
+    # int16 columns that are not dates are not treated as day offsets, so the value
+    # that represents a missing day offset is compared as an ordinary value
+    a = pd.Series([NULL_DAY, 1], dtype="int16", name="a")
+    b = pd.Series([NULL_DAY, 1], dtype="int16", name="b")
+
+    assert list(gte(a, b)) == [True, True]
+    assert list(lte(a, b)) == [True, True]
@@ -1,4 +1,6 @@
-from analysis.compute_uptake import compute_uptake
+from pandas.testing import assert_frame_equal
+
+from analysis.compute_uptake import compute_uptake, compute_uptake_cube
 from analysis.transform_fast import load_raw_cohort, transform
 
 
@@ -21,3 +23,56 @@ def test_compute_uptake():
 
     assert uptake[3]["total"] == (expected_total // 7) * 7
     assert uptake[3]["2021-01-01"] == (expected_by_nyd // 7) * 7
+
+
+def test_compute_uptake_by_date():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)
+
+    uptake = compute_uptake(cohort, "vacc1_dat", "sex")
+
+    assert list(uptake.columns) == ["F", "M"]
+    assert uptake.index[-1] == "total"
+
+    for sex in ["F", "M"]:
+        vacc1_dates = cohort[cohort["sex"] == sex]["vacc1_dat"].dropna()
+        expected_total = (cohort["sex"] == sex).sum()
+        assert uptake[sex]["total"] == (expected_total // 7) * 7
+
+        for date in uptake.index[:-1]:
+            expected = (vacc1_dates <= date).sum()
+            assert uptake[sex][date] == (expected // 7) * 7
+
+
+def test_compute_uptake_with_compact_dates():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)
+
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    compact_cohort = transform(raw_cohort, compact_dates=True)
+
+    assert_frame_equal(
+        compute_uptake(cohort, "vacc1_dat", "wave"),
+        compute_uptake(compact_cohort, "vacc1_dat", "wave"),
+    )
+
+
+def test_compute_uptake_cube():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)
+
+    event_cols = ["vacc1_dat", "azd1rx_dat"]
+    stratification_cols = ["sex", "ethnicity", "imd_band", "preg_group"]
+    cube = compute_uptake_cube(cohort, event_cols, "wave", stratification_cols)
+
+    for event_col in event_cols:
+        for stratification_col in stratification_cols:
+            for wave in range(0, 9 + 1):
+                wave_cohort = cohort[cohort["wave"] == wave]
+                expected = compute_uptake(wave_cohort, event_col, stratification_col)
+                key = (event_col, stratification_col, wave)
+
+                if expected is None:
+                    assert key not in cube
+                else:
+                    assert_frame_equal(cube[key], expected)
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import numpy as np
+
+from analysis import compute_uptake_for_paper, transform_fast
+from analysis.compute_uptake import compute_uptake_cube_from_arrays
+from analysis.transform_fast import load_raw_cohort, transform
+
+
+def test_run_in_parallel(tmp_path):
+    cohort_path = tmp_path / "cohort.parquet"
+    transform_fast.run("tests/input.csv", cohort_path)
+
+    compute_uptake_for_paper.run(cohort_path, tmp_path / "serial")
+    compute_uptake_for_paper.run(cohort_path, tmp_path / "parallel", processes=2)
+
+    serial_paths = get_relative_paths(tmp_path / "serial")
+    parallel_paths = get_relative_paths(tmp_path / "parallel")
+    assert serial_paths
+    assert serial_paths == parallel_paths
+
+    for path in serial_paths:
+        serial_bytes = (tmp_path / "serial" / path).read_bytes()
+        parallel_bytes = (tmp_path / "parallel" / path).read_bytes()
+        assert serial_bytes == parallel_bytes, path
+
+
+def test_encode_cohort_with_all_missing_column():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)
+    cohort["imd_band"] = np.nan
+
+    arrays, vals = compute_uptake_for_paper.encode_cohort(
+        cohort, ["vacc1_dat"], ["wave", "imd_band"]
+    )
+
+    assert vals["imd_band"] == []
+    assert arrays["imd_band_codes"].dtype == "int8"
+    assert (arrays["imd_band_codes"] == -1).all()
+
+    cube = compute_uptake_cube_from_arrays(
+        {"vacc1_dat": (arrays["vacc1_dat_days"], arrays["vacc1_dat_mask"])},
+        (arrays["wave_codes"], vals["wave"]),
+        {"imd_band": (arrays["imd_band_codes"], vals["imd_band"])},
+    )
+
+    assert cube
+    for uptake in cube.values():
+        assert list(uptake.columns) == []
+
+
+def get_relative_paths(root):
+    return sorted(
+        path.relative_to(root) for path in Path(root).rglob("*") if path.is_file()
+    )
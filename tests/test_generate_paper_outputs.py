@@ -0,0 +1,104 @@
+import base64
+import os
+
+import pandas as pd
+
+from analysis.generate_paper_outputs import (
+    get_source_paths,
+    load_chart_spec,
+    load_uptake,
+    render_charts,
+    write_chart_spec,
+)
+from analysis.manifest import compute_digest
+
+
+def test_render_charts(tmp_path):
+    index = list(pd.date_range("2020-12-08", "2021-01-12").strftime("%Y-%m-%d"))
+    uptake_pc = pd.DataFrame(
+        {"Female": range(len(index)), "Male": range(0, 2 * len(index), 2)},
+        index=index,
+    )
+
+    def get_tasks(out_path):
+        return [
+            ((uptake_pc.copy(), "Title", f"{out_path}/chart_1.png"), {}),
+            ((uptake_pc.copy(), "Title", f"{out_path}/chart_2.png", 20), {}),
+            (
+                (uptake_pc.copy(), "Title", f"{out_path}/chart_3.png"),
+                {"is_percent": False},
+            ),
+        ]
+
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "parallel").mkdir()
+    encoded_charts = render_charts(get_tasks(tmp_path / "serial"), processes=1)
+    render_charts(get_tasks(tmp_path / "parallel"), processes=2)
+
+    for name in ["chart_1.png", "chart_2.png", "chart_3.png"]:
+        serial_bytes = (tmp_path / "serial" / name).read_bytes()
+        parallel_bytes = (tmp_path / "parallel" / name).read_bytes()
+        assert serial_bytes == parallel_bytes, name
+
+        encoded = encoded_charts[f"{tmp_path / 'serial'}/{name}"]
+        assert base64.b64decode(encoded) == serial_bytes, name
+
+    assert render_charts(get_tasks(tmp_path / "serial"), encode=False) == {}
+
+
+def test_load_uptake_with_cache(tmp_path):
+    path = tmp_path / "uptake.csv"
+    path.write_text(",F,M\n2020-12-07,1,2\n2020-12-08,3,4\n2020-12-09,5,6\ntotal,7,8\n")
+
+    cache = {}
+    uptake = load_uptake(path, "2020-12-08", "2020-12-09", cache)
+    assert list(uptake.index) == ["2020-12-08", "2020-12-09", "total"]
+
+    # The cached DataFrame is returned, even though the file has gone
+    path.unlink()
+    assert load_uptake(path, "2020-12-08", "2020-12-09", cache) is uptake
+    assert load_uptake(path, "2020-12-08", "2020-12-09") is None
+
+
+def test_write_chart_spec(tmp_path):
+    index = list(pd.date_range("2020-12-07", "2020-12-16").strftime("%Y-%m-%d"))
+    uptake_pc = pd.DataFrame(
+        {
+            "Asian or Asian British - Bangladeshi": [10.0] * len(index),
+            "Asian or Asian British - Indian": [20.0] * len(index),
+            "Asian or Asian British - Pakistani": [30.0] * len(index),
+        },
+        index=index,
+    )
+    chart_path = tmp_path / "chart.png"
+
+    spec = write_chart_spec(
+        uptake_pc, "Title", chart_path, 25, highlight_bangladeshi_ethnicity=True
+    )
+
+    assert not chart_path.exists()
+    assert load_chart_spec(chart_path) == spec
+    assert spec["dates"] == index
+    assert spec["tick_labels"] == {"2020-12-08": "08 Dec 2020", "2020-12-15": "15 Dec"}
+    assert spec["cohort_average"] == 25
+    assert [series["label"] for series in spec["series"]] == [
+        "Asian or Asian British - Bangladeshi",
+        "Asian or Asian British",
+        "Asian or Asian British",
+    ]
+    assert [series["in_legend"] for series in spec["series"]] == [True, True, False]
+    assert spec["series"][0]["values"] == [10.0] * len(index)
+
+
+def test_get_source_paths(tmp_path):
+    names = [os.path.basename(path) for path in get_source_paths()]
+    for name in ["chart_images.py", "templating.py", "summary.html"]:
+        assert name in names
+
+    template_path = tmp_path / "summary.html"
+    template_path.write_text("<p>{{ title }}</p>")
+    digest = compute_digest(get_source_paths(tmp_path), [])
+
+    # Changing a template changes the digest of the sources
+    template_path.write_text("<h1>{{ title }}</h1>")
+    assert compute_digest(get_source_paths(tmp_path), []) != digest
@@ -0,0 +1,75 @@
+import numpy as np
+from pandas.testing import assert_frame_equal
+
+from analysis.cohort_store import read_cohort, read_cohort_columns
+from analysis.count_prevalences import count_prevalences
+from analysis.group_flags import (
+    FLAGS_COL,
+    count_each_group,
+    flag_cols,
+    in_all_groups,
+    in_any_group,
+    in_groups,
+    pack,
+    pack_groups,
+    unpack_groups,
+)
+from analysis.transform_fast import load_raw_cohort, necessary_cols, transform
+from analysis.transform_fast import run as transform_fast_run
+
+
+def get_cohort():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    return transform(raw_cohort)[necessary_cols]
+
+
+def test_flag_cols():
+    assert flag_cols == [col for col in necessary_cols if col.endswith("_group")]
+
+
+def test_pack_groups_round_trip():
+    cohort = get_cohort()
+    packed_cohort = cohort.copy()
+
+    pack_groups(packed_cohort)
+    assert packed_cohort[FLAGS_COL].dtype == "uint32"
+    assert not any(col.endswith("_group") for col in packed_cohort.columns)
+
+    unpack_groups(packed_cohort)
+    assert_frame_equal(packed_cohort[necessary_cols], cohort)
+
+
+def test_queries():
+    cohort = get_cohort()
+    flags = pack(cohort)
+
+    assert count_each_group(flags) == {col: cohort[col].sum() for col in flag_cols}
+
+    cols = ["atrisk_group", "shield_group"]
+    expected_all = (cohort["atrisk_group"] & cohort["shield_group"]).values
+    expected_any = (cohort["atrisk_group"] | cohort["shield_group"]).values
+    assert np.array_equal(in_all_groups(flags, cols), expected_all)
+    assert np.array_equal(in_any_group(flags, cols), expected_any)
+    assert np.array_equal(in_groups(cohort, cols), expected_all)
+
+    cohort[FLAGS_COL] = flags
+    assert np.array_equal(in_groups(cohort.drop(columns=cols), cols), expected_all)
+
+
+def test_count_prevalences_with_packed_groups():
+    cohort = get_cohort()
+    packed_cohort = cohort.copy()
+    pack_groups(packed_cohort)
+
+    assert_frame_equal(count_prevalences(packed_cohort), count_prevalences(cohort))
+
+
+def test_read_cohort_with_packed_groups(tmp_path):
+    path = tmp_path / "cohort.parquet"
+    packed_path = tmp_path / "packed_cohort.parquet"
+    transform_fast_run("tests/input.csv", path)
+    transform_fast_run("tests/input.csv", packed_path, packed_groups=True)
+
+    assert FLAGS_COL in read_cohort_columns(packed_path)
+    cols = ["wave", "atrisk_group", "vacc1_dat", "cld_group"]
+    assert_frame_equal(read_cohort(packed_path, cols), read_cohort(path, cols))
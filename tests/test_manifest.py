@@ -0,0 +1,29 @@
+from analysis.manifest import Manifest, compute_digest
+
+
+def test_manifest(tmp_path):
+    in_path = tmp_path / "in.csv"
+    out_path = tmp_path / "out.csv"
+    manifest_path = tmp_path / "manifest.json"
+
+    in_path.write_text("a,b\n1,2\n")
+    digest = compute_digest([in_path], ["2021-01-01"])
+    assert digest != compute_digest([in_path], ["2021-01-02"])
+
+    manifest = Manifest(manifest_path)
+    assert not manifest.is_fresh("out", digest)
+
+    out_path.write_text("output")
+    manifest.record("out", digest, [out_path])
+    manifest.save()
+
+    manifest = Manifest(manifest_path)
+    assert manifest.is_fresh("out", digest)
+
+    # Changing an input changes the digest
+    in_path.write_text("a,b\n1,3\n")
+    assert not manifest.is_fresh("out", compute_digest([in_path], ["2021-01-01"]))
+
+    # Removing an output means the unit is not fresh
+    out_path.unlink()
+    assert not manifest.is_fresh("out", digest)
@@ -0,0 +1,12 @@
+from analysis.templating import get_environment, render_template
+
+
+def test_render_template(tmp_path):
+    (tmp_path / "greeting.html").write_text("<p>Hello {{ name }}</p>")
+
+    assert render_template("greeting.html", {"name": "A"}, tmp_path) == "<p>Hello A</p>"
+    assert render_template("greeting.html", {"name": "B"}, tmp_path) == "<p>Hello B</p>"
+
+    env = get_environment(tmp_path)
+    assert env is get_environment(tmp_path)
+    assert env.get_template("greeting.html") is env.get_template("greeting.html")
@@ -1,6 +1,26 @@
 import pandas as pd
+from pandas.testing import assert_frame_equal
 
-from analysis.transform_fast import load_raw_cohort, transform
+from analysis.day_offsets import decode_dates
+from analysis.transform_fast import (
+    load_raw_cohort,
+    load_raw_cohort_in_chunks,
+    necessary_cols,
+    raw_cols,
+    transform,
+    transform_lazy,
+)
+
+
+def test_load_raw_cohort():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+
+    assert set(raw_cohort.columns) == set(raw_cols)
+    assert "stp" not in raw_cohort.columns
+    assert raw_cohort["age"].dtype == "int16"
+    assert raw_cohort["sex"].dtype == "category"
+    assert raw_cohort["imd"].dtype == "float32"
+    assert raw_cohort["covadm1_dat"].dtype == "datetime64[ns]"
 
 
 def test_drop_non_fm_sex():
@@ -219,3 +239,48 @@ def test_add_extra_at_risk_cols():
         assert row["chd_cov_group"] == pd.notnull(row["chd_cov_dat"])
         assert row["spln_cov_group"] == pd.notnull(row["spln_cov_dat"])
         assert row["learndis_group"] == pd.notnull(row["learndis_dat"])
+
+
+def test_transform_in_chunks():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)[necessary_cols]
+
+    chunked_cohort = pd.concat(
+        transform(raw_chunk)[necessary_cols]
+        for raw_chunk in load_raw_cohort_in_chunks("tests/input.csv", 999)
+    )
+
+    assert_frame_equal(cohort, chunked_cohort)
+
+
+def test_transform_with_compact_dates():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)[necessary_cols]
+
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    compact_cohort = transform(raw_cohort, compact_dates=True)[necessary_cols]
+    assert compact_cohort["vacc1_dat"].dtype == "int16"
+
+    decode_dates(compact_cohort)
+    assert_frame_equal(cohort, compact_cohort)
+
+
+def test_transform_lazy():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    cohort = transform(raw_cohort)[necessary_cols]
+
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    lazy_cohort = transform_lazy(raw_cohort)
+    assert_frame_equal(cohort, lazy_cohort.project(necessary_cols))
+
+
+def test_transform_lazy_computes_only_dependencies():
+    raw_cohort = load_raw_cohort("tests/input.csv")
+    lazy_cohort = transform_lazy(raw_cohort)
+    lazy_cohort.project(["wave", "vacc1_dat"])
+
+    assert "wave" in lazy_cohort.derived_cols
+    assert "shield_group" in lazy_cohort.derived_cols
+    assert "imd_band" not in lazy_cohort.derived_cols
+    assert "age_band" not in lazy_cohort.derived_cols
+    assert "mod1rx_dat" not in lazy_cohort.derived_cols
@@ -8,6 +8,7 @@ from analysis.transform_fast import (
     transform as transform_fast,
 )
 from analysis.transform_slow import transform as transform_slow
+from analysis.transform_slow import transform_in_parallel, transform_rows
 
 
 def test_transform_slow():
@@ -20,3 +21,22 @@ def test_transform_slow():
 
     cohort_2 = cohort_2[cohort.columns]
     assert_frame_equal(cohort, cohort_2)
+
+
+def test_transform_in_parallel():
+    with open("tests/input.csv") as f:
+        reader = csv.DictReader(f)
+        cohort = transform_slow(reader)
+
+    cohort_2 = transform_in_parallel("tests/input.csv", processes=2, num_shards=7)
+    assert_frame_equal(cohort, cohort_2)
+
+
+def test_transform_rows_block_size():
+    with open("tests/input.csv") as f:
+        rows = list(transform_rows(csv.DictReader(f)))
+
+    with open("tests/input.csv") as f:
+        rows_2 = list(transform_rows(csv.DictReader(f), block_size=7))
+
+    assert rows == rows_2